@@ -0,0 +1,54 @@
+"""
+Chromedriver resolution shared by the Lighthouse Automation Suite scripts
+Remembers where webdriver-manager installed chromedriver, so later runs skip its online version check
+"""
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from webdriver_manager.chrome import ChromeDriverManager
+
+# Where the resolved chromedriver path is remembered between runs
+CHROMEDRIVER_PATH_FILE = Path.home() / ".wdm" / "lighthouse_chromedriver_path"
+
+def cached_driver_path(max_age=None):
+    """
+    Return the chromedriver path remembered by an earlier install.
+    Args:
+        max_age (float): Ignore a remembered path older than this many seconds; None accepts any age.
+    Returns:
+        str: The path, or None if nothing usable is remembered (missing, too old, or no longer executable).
+    """
+    try:
+        if max_age is not None and time.time() - CHROMEDRIVER_PATH_FILE.stat().st_mtime >= max_age:
+            return None
+        cached = CHROMEDRIVER_PATH_FILE.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return cached if cached and os.access(cached, os.X_OK) else None
+
+def install_driver():
+    """
+    Install chromedriver through webdriver-manager (checking online for the matching version)
+    and remember the resulting path.
+    Returns:
+        str: The chromedriver path.
+    """
+    path = ChromeDriverManager().install()
+    try:
+        CHROMEDRIVER_PATH_FILE.parent.mkdir(parents=True, exist_ok=True)
+        CHROMEDRIVER_PATH_FILE.write_text(path, encoding="utf-8")
+    except OSError:
+        pass  # Not fatal; the next run just checks online again
+    return path
+
+@lru_cache(maxsize=1)
+def driver_path():
+    """Resolve the chromedriver binary once per run, reusing a previous run's path while it still exists."""
+    return cached_driver_path() or install_driver()
+
+def forget_driver_path():
+    """Drop the remembered chromedriver, e.g. after a Chrome update made it incompatible."""
+    CHROMEDRIVER_PATH_FILE.unlink(missing_ok=True)
+    driver_path.cache_clear()
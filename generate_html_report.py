@@ -3,6 +3,7 @@
 Enhanced HTML Report Generator for Lighthouse Results
 Generates a comprehensive color-coded HTML dashboard
 """
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
@@ -12,9 +13,9 @@ def generate_html_report(csv_file="pagespeed_results.csv", html_file="pagespeed_
     try:
         df = pd.read_csv(csv_file)
 
-        # Remove duplicates
+        # Remove duplicates, keeping the most recent analysis of each URL
         initial_count = len(df)
-        df = df.drop_duplicates(subset=['url'], keep='first')
+        df = df.drop_duplicates(subset=['url'], keep='last')
         final_count = len(df)
 
         if initial_count != final_count:
@@ -946,6 +947,62 @@ def generate_html_report(csv_file="pagespeed_results.csv", html_file="pagespeed_
         print(f"❌ Error generating enhanced HTML report: {e}")
 
 
+# Core Web Vitals thresholds: (good, poor) upper bounds per metric, the same for mobile and
+# desktop; lower is better and timings are in seconds
+_THRESHOLDS = {
+    'first_contentful_paint': (1.8, 3.0),
+    'largest_contentful_paint': (2.5, 4.0),
+    'total_blocking_time': (0.2, 0.6),
+    'cumulative_layout_shift': (0.1, 0.25),
+    'speed_index': (3.4, 5.8)
+}
+
+# CSS class for each threshold bucket: within good, within poor, beyond poor
+_METRIC_CLASSES = np.array(['score-good', 'score-average', 'score-poor'])
+
+# CSV columns classified against _THRESHOLDS
+_METRIC_COLUMNS = tuple(f"{device}_{metric}" for device in ('mobile', 'desktop') for metric in _THRESHOLDS)
+
+def _metric_thresholds(metric_name):
+    """Return the (good, poor) thresholds for a column such as 'mobile_speed_index', or None"""
+    device, _, metric = metric_name.partition('_')
+    return _THRESHOLDS.get(metric) if device in ('mobile', 'desktop') else None
+
+# Unit suffixes of metric display values ("1.2 s", "450 ms", "0.05") and their factor to seconds
+_UNIT_SUFFIXES = (('ms', 0.001), ('s', 1.0))
+
+def get_metric_class_series(values, metric_name):
+    """
+    Return the CSS class for every value of a Core Web Vitals column in one pass.
+    Args:
+        values (pd.Series): Metric display values such as "1.2 s", "450 ms" or "0.05".
+        metric_name (str): CSV column name, used to pick the thresholds.
+    Returns:
+        pd.Series: 'score-good', 'score-average' or 'score-poor' for each value (same index);
+                   missing or unparseable values are 'score-poor'.
+    """
+    thresholds = _metric_thresholds(metric_name)
+    if thresholds is None:
+        return pd.Series('score-poor', index=values.index)
+
+    # Strip the first matching unit suffix and scale to seconds, so millisecond values (e.g. TBT)
+    # compare against the same thresholds; anything unparseable becomes NaN
+    text = values.astype(str).str.replace(',', '', regex=False).str.strip()
+    number_text = text
+    factor = pd.Series(1.0, index=values.index)
+    unmatched = pd.Series(True, index=values.index)
+    for suffix, suffix_factor in _UNIT_SUFFIXES:
+        has_suffix = unmatched & text.str.endswith(suffix)
+        number_text = number_text.mask(has_suffix, text.str[:-len(suffix)])
+        factor = factor.mask(has_suffix, suffix_factor)
+        unmatched &= ~has_suffix
+    numeric = pd.to_numeric(number_text.str.strip(), errors='coerce') * factor
+
+    # Bucket index per value: 0 up to good, 1 up to poor, 2 above; NaN sorts last, so
+    # missing values land in 'score-poor'
+    buckets = np.searchsorted(thresholds, numeric.to_numpy(), side='left')
+    return pd.Series(_METRIC_CLASSES[buckets], index=values.index)
+
 def generate_performance_tables(df):
     """Generate URL-specific performance tables - one URL at a time with mobile/desktop and Core Web Vitals"""
     def get_score_class(score):
@@ -1010,56 +1067,18 @@ def generate_performance_tables(df):
 			</div>
 		'''
 
-    def get_metric_class(metric_name, value_str):
-        """Return CSS class based on Core Web Vitals thresholds"""
-        try:
-            # Handle different value formats
-            if pd.isna(value_str) or value_str == '' or value_str == 'N/A':
-                return 'score-poor'
-
-            # Convert value to float, handling 's' and 'ms' suffixes
-            value_clean = str(value_str).replace('s', '').replace('ms', '').replace(',', '').strip()
-            if not value_clean:
-                return 'score-poor'
-
-            value = float(value_clean)
-
-            # Convert ms to seconds for TBT
-            if 'ms' in str(value_str):
-                value = value / 1000
-
-            # Core Web Vitals thresholds
-            thresholds = {
-                'mobile_first_contentful_paint': (1.8, 3.0),
-                'desktop_first_contentful_paint': (1.8, 3.0),
-                'mobile_largest_contentful_paint': (2.5, 4.0),
-                'desktop_largest_contentful_paint': (2.5, 4.0),
-                'mobile_total_blocking_time': (0.2, 0.6),  # in seconds
-                'desktop_total_blocking_time': (0.2, 0.6),  # in seconds
-                'mobile_cumulative_layout_shift': (0.1, 0.25),
-                'desktop_cumulative_layout_shift': (0.1, 0.25),
-                'mobile_speed_index': (3.4, 5.8),
-                'desktop_speed_index': (3.4, 5.8)
-            }
-
-            if metric_name in thresholds:
-                good_threshold, poor_threshold = thresholds[metric_name]
-                if value <= good_threshold:
-                    return 'score-good'
-                elif value <= poor_threshold:
-                    return 'score-average'
-                else:
-                    return 'score-poor'
-
-            return 'score-poor'
-        except (ValueError, TypeError):
-            return 'score-poor'
-
     html = ""
 
+    # Classify each Core Web Vitals column once instead of value by value
+    metric_classes = {
+        metric_name: get_metric_class_series(df[metric_name], metric_name)
+        for metric_name in _METRIC_COLUMNS if metric_name in df
+    }
+
     # Generate URL-specific sections
-    for index, (_, row) in enumerate(df.iterrows(), 1):
+    for index, (label, row) in enumerate(df.iterrows(), 1):
         url = row.get('url', 'N/A')
+        classes = {metric_name: column.at[label] for metric_name, column in metric_classes.items()}
         pagespeed_url = row.get('final_url', '')
 
         html += f"""
@@ -1132,11 +1151,11 @@ def generate_performance_tables(df):
 						</thead>
 						<tbody>
 							<tr>
-								<td><span class="score {get_metric_class('mobile_first_contentful_paint', row.get('mobile_first_contentful_paint', 'N/A'))}">{row.get('mobile_first_contentful_paint', 'N/A')}</span></td>
-								<td><span class="score {get_metric_class('mobile_largest_contentful_paint', row.get('mobile_largest_contentful_paint', 'N/A'))}">{row.get('mobile_largest_contentful_paint', 'N/A')}</span></td>
-								<td><span class="score {get_metric_class('mobile_total_blocking_time', row.get('mobile_total_blocking_time', 'N/A'))}">{row.get('mobile_total_blocking_time', 'N/A')}</span></td>
-								<td><span class="score {get_metric_class('mobile_cumulative_layout_shift', row.get('mobile_cumulative_layout_shift', 'N/A'))}">{row.get('mobile_cumulative_layout_shift', 'N/A')}</span></td>
-								<td><span class="score {get_metric_class('mobile_speed_index', row.get('mobile_speed_index', 'N/A'))}">{row.get('mobile_speed_index', 'N/A')}</span></td>
+								<td><span class="score {classes.get('mobile_first_contentful_paint', 'score-poor')}">{row.get('mobile_first_contentful_paint', 'N/A')}</span></td>
+								<td><span class="score {classes.get('mobile_largest_contentful_paint', 'score-poor')}">{row.get('mobile_largest_contentful_paint', 'N/A')}</span></td>
+								<td><span class="score {classes.get('mobile_total_blocking_time', 'score-poor')}">{row.get('mobile_total_blocking_time', 'N/A')}</span></td>
+								<td><span class="score {classes.get('mobile_cumulative_layout_shift', 'score-poor')}">{row.get('mobile_cumulative_layout_shift', 'N/A')}</span></td>
+								<td><span class="score {classes.get('mobile_speed_index', 'score-poor')}">{row.get('mobile_speed_index', 'N/A')}</span></td>
 							</tr>
 						</tbody>
 					</table>
@@ -1156,11 +1175,11 @@ def generate_performance_tables(df):
 						</thead>
 						<tbody>
 							<tr>
-								<td><span class="score {get_metric_class('desktop_first_contentful_paint', row.get('desktop_first_contentful_paint', 'N/A'))}">{row.get('desktop_first_contentful_paint', 'N/A')}</span></td>
-								<td><span class="score {get_metric_class('desktop_largest_contentful_paint', row.get('desktop_largest_contentful_paint', 'N/A'))}">{row.get('desktop_largest_contentful_paint', 'N/A')}</span></td>
-								<td><span class="score {get_metric_class('desktop_total_blocking_time', row.get('desktop_total_blocking_time', 'N/A'))}">{row.get('desktop_total_blocking_time', 'N/A')}</span></td>
-								<td><span class="score {get_metric_class('desktop_cumulative_layout_shift', row.get('desktop_cumulative_layout_shift', 'N/A'))}">{row.get('desktop_cumulative_layout_shift', 'N/A')}</span></td>
-								<td><span class="score {get_metric_class('desktop_speed_index', row.get('desktop_speed_index', 'N/A'))}">{row.get('desktop_speed_index', 'N/A')}</span></td>
+								<td><span class="score {classes.get('desktop_first_contentful_paint', 'score-poor')}">{row.get('desktop_first_contentful_paint', 'N/A')}</span></td>
+								<td><span class="score {classes.get('desktop_largest_contentful_paint', 'score-poor')}">{row.get('desktop_largest_contentful_paint', 'N/A')}</span></td>
+								<td><span class="score {classes.get('desktop_total_blocking_time', 'score-poor')}">{row.get('desktop_total_blocking_time', 'N/A')}</span></td>
+								<td><span class="score {classes.get('desktop_cumulative_layout_shift', 'score-poor')}">{row.get('desktop_cumulative_layout_shift', 'N/A')}</span></td>
+								<td><span class="score {classes.get('desktop_speed_index', 'score-poor')}">{row.get('desktop_speed_index', 'N/A')}</span></td>
 							</tr>
 						</tbody>
 					</table>
@@ -1,289 +1,990 @@
+import argparse
+import base64
 import csv
+import hashlib
+import logging
+import logging.handlers
 import time
 import random
-import json
 import os
-from datetime import datetime
+import queue
+import shutil
+import tempfile
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+import diskcache
+import orjson
+import requests
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException, WebDriverException
 from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from fake_useragent import UserAgent
+from chromedriver_utils import driver_path, forget_driver_path
+from urls_utils import parse_urls
+
+log = logging.getLogger("psi")
+
+# Optional: lossless PNG recompression for screenshots (pip install pyoxipng)
+try:
+    import oxipng
+except ImportError:
+    oxipng = None
+
+# Recent desktop browser user agents, rotated per browser session
+_UAS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36 Edg/126.0.0.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) Gecko/20100101 Firefox/127.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14.5; rv:127.0) Gecko/20100101 Firefox/127.0",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15"
+]
+
+def setup_logging(verbose=False):
+    """
+    Send progress messages to stdout as plain lines.
+    Args:
+        verbose (bool): Whether to include per-step debug messages.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(logging.DEBUG if verbose else logging.INFO)
+    log.propagate = False
+
+@contextmanager
+def queued_logging():
+    """
+    Route log records through a queue while workers run, so formatting and console
+    output happen on a single listener thread instead of every worker taking the stdout lock.
+    """
+    handlers = list(log.handlers)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    for handler in handlers:
+        log.removeHandler(handler)
+    log.addHandler(queue_handler)
+    listener.start()
+    try:
+        yield
+    finally:
+        # Stopping the listener drains everything still queued
+        log.removeHandler(queue_handler)
+        listener.stop()
+        for handler in handlers:
+            log.addHandler(handler)
+
+# Lighthouse category keys mapped to the column suffix used in the CSV
+_CATEGORY_KEY_TO_NAME = {
+    'performance': 'performance',
+    'accessibility': 'accessibility',
+    'best-practices': 'best_practices',
+    'seo': 'seo',
+    'pwa': 'pwa'
+}
+
+def _format_ms(numeric_value):
+    """Format a millisecond timing as seconds or milliseconds."""
+    if numeric_value >= 1000:
+        return f"{numeric_value/1000:.2f} s"
+    return f"{numeric_value:.0f} ms"
+
+def _format_cls(numeric_value):
+    """Format a Cumulative Layout Shift score."""
+    return f"{numeric_value:.3f}"
+
+# Lighthouse audit keys mapped to (table display name, CSV column suffix, numericValue formatter)
+_METRIC_MAP = {
+    'first-contentful-paint': ('First Contentful Paint', 'first_contentful_paint', _format_ms),
+    'largest-contentful-paint': ('Largest Contentful Paint', 'largest_contentful_paint', _format_ms),
+    'total-blocking-time': ('Total Blocking Time', 'total_blocking_time', _format_ms),
+    'cumulative-layout-shift': ('Cumulative Layout Shift', 'cumulative_layout_shift', _format_cls),
+    'speed-index': ('Speed Index', 'speed_index', _format_ms),
+    'interactive': ('Time to Interactive', 'time_to_interactive', _format_ms),
+    'first-meaningful-paint': ('First Meaningful Paint', 'first_meaningful_paint', _format_ms)
+}
+
+@dataclass(slots=True)
+class PSIResult:
+    """
+    One analyzed URL: scores are 0-100 ints, metrics are display strings (e.g. "1.2 s").
+    Fields in declaration order are the structured CSV columns (original clean format).
+    """
+    url: str
+    final_url: str
+    # Mobile scores
+    mobile_performance: int | None = None
+    mobile_accessibility: int | None = None
+    mobile_best_practices: int | None = None
+    mobile_seo: int | None = None
+    # Desktop scores
+    desktop_performance: int | None = None
+    desktop_accessibility: int | None = None
+    desktop_best_practices: int | None = None
+    desktop_seo: int | None = None
+    # Mobile metrics
+    mobile_first_contentful_paint: str | None = None
+    mobile_largest_contentful_paint: str | None = None
+    mobile_total_blocking_time: str | None = None
+    mobile_cumulative_layout_shift: str | None = None
+    mobile_speed_index: str | None = None
+    mobile_time_to_interactive: str | None = None
+    mobile_first_meaningful_paint: str | None = None
+    # Desktop metrics
+    desktop_first_contentful_paint: str | None = None
+    desktop_largest_contentful_paint: str | None = None
+    desktop_total_blocking_time: str | None = None
+    desktop_cumulative_layout_shift: str | None = None
+    desktop_speed_index: str | None = None
+    desktop_time_to_interactive: str | None = None
+    desktop_first_meaningful_paint: str | None = None
+    # When the analysis finished (used to skip recently analyzed URLs)
+    timestamp: str | None = None
+    # Values without a column of their own (e.g. an unexpected Lighthouse category)
+    extras: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_values(cls, url, final_url, timestamp, values):
+        """Build a result from extracted values keyed by CSV column name."""
+        known = {key: value for key, value in values.items() if key in _FIELDNAME_SET}
+        extras = {key: value for key, value in values.items() if key not in _FIELDNAME_SET}
+        return cls(url, final_url, timestamp=timestamp, extras=extras, **known)
+
+    def as_row(self):
+        """Return the CSV row for this result, keyed by column name."""
+        row = {name: getattr(self, name) for name in _FIELDNAMES}
+        row.update(self.extras)
+        return row
+
+# Structured CSV columns; extra fields are appended at runtime
+_FIELDNAMES = tuple(f.name for f in fields(PSIResult) if f.name != "extras")
+_FIELDNAME_SET = frozenset(_FIELDNAMES)
+
+# Columns seen at runtime beyond _FIELDNAMES, in first-seen order
+_extra_fieldnames = []
+
+def register_fieldnames(keys):
+    """
+    Record any keys that aren't known CSV columns yet.
+    Args:
+        keys: Column names from a result row or an existing CSV header.
+    Returns:
+        bool: True if at least one new column was added.
+    """
+    added = False
+    for key in keys:
+        if key not in _FIELDNAME_SET and key not in _extra_fieldnames:
+            _extra_fieldnames.append(key)
+            added = True
+    return added
 
-# Global screenshot directory to persist across all URLs in a session
-SCREENSHOT_DIR = None
-def initialize_screenshot_directory():
-    """Initialize a single screenshot directory for the entire session"""
-    global SCREENSHOT_DIR
-    if SCREENSHOT_DIR is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        SCREENSHOT_DIR = f"screenshots-{timestamp}"
+def current_fieldnames():
+    """Return the full CSV header: the standard columns followed by any extras seen so far."""
+    return list(_FIELDNAMES) + _extra_fieldnames
 
-        if not os.path.exists(SCREENSHOT_DIR):
-            os.makedirs(SCREENSHOT_DIR)
-            print(f"📁 Created screenshot directory: {SCREENSHOT_DIR}")
+# Every audit any extractor reads; other audits are dropped right after parsing
+_ALL_NEEDED_AUDITS = frozenset(_METRIC_MAP)
 
-    return SCREENSHOT_DIR
+class LighthouseView:
+    """
+    The parts of a Lighthouse report the extractors use.
+    Keeps references to the categories and only the audits listed in
+    _ALL_NEEDED_AUDITS, so the rest of the report can be freed immediately.
+    """
+    __slots__ = ("categories", "audits")
+
+    def __init__(self, lighthouse_json):
+        self.categories = lighthouse_json.get('categories', {})
+        all_audits = lighthouse_json.get('audits', {})
+        self.audits = {key: all_audits[key] for key in _ALL_NEEDED_AUDITS if key in all_audits}
+
+# Reads the window globals where PageSpeed Insights exposes the raw Lighthouse reports
+_FETCH_REPORTS_JS = """
+const [needMobile, needDesktop] = arguments;
+const mobile = window.__LIGHTHOUSE_MOBILE_JSON__;
+const desktop = window.__LIGHTHOUSE_DESKTOP_JSON__;
+return [
+    needMobile && mobile ? JSON.stringify(mobile) : null,
+    needDesktop && desktop ? JSON.stringify(desktop) : null
+];
+"""
+
+# Resolves once the report globals are set (one of them, or both), polling inside the page
+# so a wait costs one WebDriver call; resolves false when timeoutMs runs out first
+_WAIT_FOR_REPORTS_JS = """
+const [both, timeoutMs, done] = arguments;
+const ready = () => {
+    const mobile = window.__LIGHTHOUSE_MOBILE_JSON__;
+    const desktop = window.__LIGHTHOUSE_DESKTOP_JSON__;
+    return both ? !!(mobile && desktop) : !!(mobile || desktop);
+};
+if (ready() || timeoutMs <= 0) {
+    return done(ready());
+}
+const deadline = Date.now() + timeoutMs;
+const timer = setInterval(() => {
+    if (ready() || Date.now() >= deadline) {
+        clearInterval(timer);
+        done(ready());
+    }
+}, 100);
+"""
+
+# Backoff schedule between checks when the browser is shared (seconds): 0.2, 0.32, 0.51, ... capped at 3
+_POLL_INITIAL_DELAY = 0.2
+_POLL_BACKOFF = 1.6
+_POLL_MAX_DELAY = 3.0
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by everything that starts a PageSpeed analysis.
+    Tokens refill continuously at rate_per_min; up to burst analyses may start back to back.
+    """
 
-def capture_full_hd_screenshots(driver, url, url_index, enable_screenshots=False):
+    def __init__(self, rate_per_min, burst=1):
+        self.rate_per_sec = rate_per_min / 60.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available and consume it.
+        Returns:
+            float: Seconds spent waiting for the token.
+        """
+        waited = 0.0
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_sec)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate_per_sec
+                time.sleep(delay)
+                waited += delay
+
+# Analyses started per minute (PSI_RPM) and allowed burst size (PSI_BURST)
+RATE_LIMITER = TokenBucket(
+    rate_per_min=float(os.environ.get("PSI_RPM", "60")),
+    burst=int(os.environ.get("PSI_BURST", "1"))
+)
+
+# Concurrent URL analyses when using the PageSpeed Insights API
+PSI_WORKERS = int(os.environ.get("PSI_WORKERS", "10"))
+
+# Concurrent Chrome sessions for screenshot runs; each one holds a full browser in memory
+BROWSER_WORKERS = int(os.environ.get("PSI_BROWSER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Result rows waiting for the next batched CSV write (checkpointed every CSV_FLUSH_EVERY rows)
+CSV_FLUSH_EVERY = 50
+_pending_rows = []
+_pending_rows_lock = threading.Lock()
+
+# Seconds to wait for the first Lighthouse report before reloading the analysis page once
+REPORT_WAIT_TIMEOUT = 60
+
+# URLs whose analysis never produced a report, one per line, for a later re-run
+SLOW_URLS_FILE = "slow_urls.txt"
+_slow_urls_lock = threading.Lock()
+
+# PageSpeed Insights REST API, used instead of the browser unless screenshots are requested
+# (PSI_API_KEY raises the quota but is optional)
+PSI_API_URL = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
+PSI_CATEGORIES = ["performance", "accessibility", "best-practices", "seo"]
+
+def build_psi_session(pool_connections=32, pool_maxsize=64):
+    """
+    Build a keep-alive HTTP session for PageSpeed Insights API calls.
+    The shared connection pool reuses TLS connections across requests, and
+    throttling/server errors are retried honoring Retry-After.
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        backoff_factor=1.5,
+        respect_retry_after_header=True
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries)
+    session.mount("https://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+# Each API worker can have a mobile and a desktop request in flight; the run re-sizes this for --concurrency
+SESSION = build_psi_session(pool_maxsize=2 * PSI_WORKERS)
+
+# Results of recent analyses, shared between runs (seconds, PSI_CACHE_TTL); PSI serves
+# cached reports for a short while anyway, longer windows suit iterative re-runs
+RESULT_CACHE_TTL = int(os.environ.get("PSI_CACHE_TTL", "300"))
+RESULT_CACHE_DIR = ".psi_cache"
+
+# Opened by get_result_cache() on first use, so importing this module creates no cache directory
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache():
+    """Return the result cache, opening it on first use."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = diskcache.Cache(RESULT_CACHE_DIR)
+        return _result_cache
+
+def close_result_cache():
+    """Close the result cache if this run opened it."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is not None:
+            _result_cache.close()
+            _result_cache = None
+
+# Emulated viewports for screenshots (Emulation.setDeviceMetricsOverride parameters)
+_DEVICE_METRICS = {
+    "mobile": {"width": 412, "height": 915, "deviceScaleFactor": 2.625, "mobile": True},
+    "desktop": {"width": 1920, "height": 1080, "deviceScaleFactor": 1, "mobile": False},
+}
+
+# Click the PageSpeed Insights report tab for a device and return it (or null if not found)
+_SELECT_DEVICE_TAB_JS = """
+const device = arguments[0];
+const Device = device[0].toUpperCase() + device.slice(1);
+let tab = null;
+for (const selector of [`[data-testid='device-${device}']`, `button[aria-label*='${Device}']`, `button[aria-label*='${device}']`]) {
+    tab = document.querySelector(selector);
+    if (tab) {
+        break;
+    }
+}
+if (!tab) {
+    for (const btn of document.querySelectorAll('button, [role="tab"]')) {
+        const text = btn.textContent.toLowerCase();
+        const label = btn.getAttribute('aria-label')?.toLowerCase() || '';
+        if (text.includes(device) || label.includes(device)) {
+            tab = btn;
+            break;
+        }
+    }
+}
+if (tab) {
+    tab.click();
+}
+return tab;
+"""
+
+# Resolves once a clicked tab reports itself selected, or false after timeoutMs
+_WAIT_FOR_SELECTED_JS = """
+const [tab, timeoutMs, done] = arguments;
+const deadline = Date.now() + timeoutMs;
+const check = () => {
+    const selected = tab.getAttribute('aria-selected') === 'true';
+    if (selected || Date.now() >= deadline) {
+        done(selected);
+    } else {
+        setTimeout(check, 50);
+    }
+};
+check();
+"""
+
+def capture_full_hd_screenshots(driver, url, url_index, screenshot_dir):
     """
     Capture optimized Full HD full-page screenshots for both mobile and desktop views
     Args:
         driver: Selenium WebDriver instance
         url: URL being tested
         url_index: Index of the current URL
-        enable_screenshots: Whether to capture screenshots
+        screenshot_dir: Path of the run's screenshot directory
     """
-    if not enable_screenshots:
-        return
-
     try:
-        screenshot_dir = initialize_screenshot_directory()
-        print("📸 Capturing Full HD screenshots for mobile and desktop...")
+        log.debug("📸 Capturing Full HD screenshots for mobile and desktop...")
 
-        # Create safe filename from URL
-        safe_url = url.replace('https://', '').replace('http://', '').replace('/', '_').replace(':', '_')
-        if len(safe_url) > 50:
-            safe_url = safe_url[:50]
+        # Create safe filename from URL: readable host plus a short hash of the full URL,
+        # so pages sharing a long path prefix don't overwrite each other
+        host = urlsplit(url).netloc.replace(':', '_')[:30]
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=6).hexdigest()
+        safe_url = f"{host}_{digest}"
 
-        # Capture mobile view screenshot
-        capture_device_full_hd_screenshot(driver, "mobile", screenshot_dir, url_index, safe_url)
+        # Each capture emulates its device's viewport; restore the real one afterwards
+        try:
+            # Capture mobile view screenshot
+            capture_device_full_hd_screenshot(driver, "mobile", screenshot_dir, url_index, safe_url)
 
-        # Capture desktop view screenshot
-        capture_device_full_hd_screenshot(driver, "desktop", screenshot_dir, url_index, safe_url)
+            # Capture desktop view screenshot
+            capture_device_full_hd_screenshot(driver, "desktop", screenshot_dir, url_index, safe_url)
+        finally:
+            driver.execute_cdp_cmd("Emulation.clearDeviceMetricsOverride", {})
 
     except Exception as e:
-        print(f"⚠️  Full HD screenshot capture failed for {url}: {e}")
+        log.warning(f"⚠️  Full HD screenshot capture failed for {url}: {e}")
 
 def capture_device_full_hd_screenshot(driver, device_type, screenshot_dir, url_index, safe_url):
     """Capture Full HD screenshot for specific device view"""
     try:
-        # Try to find and click the device tab
-        device_selectors = {
-            "mobile": ["[data-testid='device-mobile']", "button[aria-label*='Mobile']", "button[aria-label*='mobile']"],
-            "desktop": ["[data-testid='device-desktop']", "button[aria-label*='Desktop']", "button[aria-label*='desktop']"]
-        }
+        # Show this device's report; one script call instead of polling each selector
+        tab = driver.execute_script(_SELECT_DEVICE_TAB_JS, device_type)
 
-        tab_found = False
-        for selector in device_selectors[device_type]:
-            try:
-                tab = WebDriverWait(driver, 3).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                )
-                tab.click()
-                tab_found = True
-                break
-            except:
-                continue
-
-        if not tab_found:
-            # Use JavaScript fallback to find device tabs
-            tab = driver.execute_script(f"""
-                const buttons = document.querySelectorAll('button, [role="tab"]');
-                for (let btn of buttons) {{
-                    const text = btn.textContent.toLowerCase();
-                    const label = btn.getAttribute('aria-label')?.toLowerCase() || '';
-                    if (text.includes('{device_type}') || label.includes('{device_type}')) {{
-                        return btn;
-                    }}
-                }}
-                return null;
-            """)
-            if tab:
-                driver.execute_script("arguments[0].click();", tab)
-                tab_found = True
-
-        if tab_found:
-            print(f"{'📱' if device_type == 'mobile' else '🖥️'} Switched to {device_type} view")
-            time.sleep(2)  # Wait for tab content to load
+        if tab:
+            log.debug(f"{'📱' if device_type == 'mobile' else '🖥️'} Switched to {device_type} view")
+            # Wait (in the page, one call) for the tab to report itself selected
+            driver.execute_async_script(_WAIT_FOR_SELECTED_JS, tab, 5000)
         else:
-            print(f"⚠️  Could not find {device_type} tab, capturing current view")
+            log.warning(f"⚠️  Could not find {device_type} tab, capturing current view")
+
+        # Emulate the device viewport (no window resize, so no browser-level relayout)
+        metrics = _DEVICE_METRICS[device_type]
+        driver.execute_cdp_cmd("Emulation.setDeviceMetricsOverride", metrics)
 
         # Get the total page height for full-page capture
         total_height = driver.execute_script("return Math.max(document.body.scrollHeight, document.documentElement.scrollHeight)")
 
-        # Set Full HD window size and capture full page
-        driver.set_window_size(1920, max(1080, total_height))
-
-        # Brief wait for content to render at new size
-        time.sleep(1)
-
-        # Capture Full HD screenshot
-        filename = f"{screenshot_dir}/fullhd_{device_type}_{url_index:02d}_{safe_url}.png"
-        driver.save_screenshot(filename)
-        print(f"✅ Full HD {device_type} screenshot saved: {filename}")
+        # Capture the full page in one DevTools call; mobile renders at 2.625x, about 1080px wide
+        screenshot = driver.execute_cdp_cmd("Page.captureScreenshot", {
+            "format": "png",
+            "captureBeyondViewport": True,
+            "clip": {
+                "x": 0, "y": 0,
+                "width": metrics["width"], "height": max(metrics["height"], total_height),
+                "scale": 1
+            }
+        })
+
+        filename = screenshot_dir / f"fullhd_{device_type}_{url_index:02d}_{safe_url}.png"
+        with open(filename, "wb") as png_file:
+            png_file.write(base64.b64decode(screenshot["data"]))
+        log.debug(f"✅ Full HD {device_type} screenshot saved: {filename}")
+        optimize_screenshot(filename)
         return True
 
     except Exception as e:
-        print(f"⚠️  Could not capture Full HD {device_type} screenshot: {e}")
+        log.warning(f"⚠️  Could not capture Full HD {device_type} screenshot: {e}")
         return False
 
-def get_pagespeed_results(url_to_test, current_index=1, total_urls=1, enable_screenshots=False):
+# Screenshot recompression runs off the worker threads so it overlaps with the next analysis
+_png_optimizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="png-optimizer") if oxipng else None
+
+def _optimize_png(filename):
+    """Losslessly recompress a PNG in place, keeping the original if anything goes wrong."""
+    try:
+        oxipng.optimize(str(filename), level=2, strip=oxipng.StripChunks.safe())
+    except Exception as e:
+        log.warning(f"⚠️  Could not optimize {filename}: {e}")
+
+def optimize_screenshot(filename):
+    """Queue a screenshot for lossless recompression when pyoxipng is installed."""
+    if _png_optimizer:
+        _png_optimizer.submit(_optimize_png, filename)
+
+def finish_screenshot_optimization():
+    """Wait for queued screenshot recompression to finish."""
+    if _png_optimizer:
+        _png_optimizer.shutdown(wait=True)
+
+def fetch_lighthouse_reports(driver, need_mobile=True, need_desktop=True):
+    """
+    Fetch the mobile and desktop Lighthouse reports from the PageSpeed Insights page
+    in a single script call. Reports are serialized in the browser so each one
+    crosses the WebDriver boundary as a single string, then parsed with orjson.
+    Args:
+        driver: Selenium WebDriver instance
+        need_mobile (bool): Whether to fetch the mobile report.
+        need_desktop (bool): Whether to fetch the desktop report.
+    Returns:
+        tuple: (mobile_json, desktop_json) as LighthouseView objects; each is None if not requested or not available yet
+    """
+    mobile_str, desktop_str = driver.execute_script(_FETCH_REPORTS_JS, need_mobile, need_desktop)
+    mobile_json = LighthouseView(orjson.loads(mobile_str)) if mobile_str else None
+    desktop_json = LighthouseView(orjson.loads(desktop_str)) if desktop_str else None
+    return mobile_json, desktop_json
+
+def wait_for_lighthouse_reports(timeout, both=False):
+    """
+    Wait until the page has a Lighthouse report (or both reports).
+    A worker with its own browser waits inside the page in a single script call. Tabs of a
+    shared browser only check and then back off, so other workers get the browser meanwhile.
+    Args:
+        timeout (float): Seconds to wait at most.
+        both (bool): Whether to wait for both the mobile and desktop report instead of either.
+    Returns:
+        bool: True if the report(s) became available in time.
+    """
+    deadline = time.monotonic() + timeout
+    delay = _POLL_INITIAL_DELAY
+    while True:
+        remaining = max(deadline - time.monotonic(), 0)
+        in_page = remaining if _shared_browser is None else 0
+        with worker_browser() as driver:
+            if driver.execute_async_script(_WAIT_FOR_REPORTS_JS, both, int(in_page * 1000)):
+                return True
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * _POLL_BACKOFF, _POLL_MAX_DELAY)
+
+# Runs the desktop request of each API analysis while its worker fetches the mobile one; set by
+# start_desktop_fetcher() for a run, None fetches the two strategies one after the other
+_desktop_fetcher = None
+
+def start_desktop_fetcher(workers):
+    """Start the pool that fetches desktop analyses alongside the workers' mobile ones."""
+    global _desktop_fetcher
+    _desktop_fetcher = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="psi-desktop")
+
+def stop_desktop_fetcher():
+    """Shut down the desktop fetch pool, if one was started."""
+    global _desktop_fetcher
+    if _desktop_fetcher is not None:
+        _desktop_fetcher.shutdown(cancel_futures=True)
+        _desktop_fetcher = None
+
+def fetch_psi_lighthouse(url, strategy, api_key):
     """
-    Gets Lighthouse scores by directly navigating to PageSpeed Insights analysis URL.
-    Extracts both mobile and desktop scores from JSON objects and optionally captures screenshots.
+    Run a PageSpeed Insights analysis through the REST API.
+    Args:
+        url (str): The URL to analyze.
+        strategy (str): "mobile" or "desktop".
+        api_key (str): PageSpeed Insights API key, or None to use the keyless quota.
+    Returns:
+        LighthouseView: The Lighthouse report from the API response, or None if it is missing.
+    """
+    RATE_LIMITER.acquire()
+    params = {"url": url, "strategy": strategy, "category": PSI_CATEGORIES}
+    if api_key:
+        params["key"] = api_key
+    response = SESSION.get(PSI_API_URL, params=params, timeout=(5, 180))
+    response.raise_for_status()
+    lighthouse_json = orjson.loads(response.content).get("lighthouseResult")
+    return LighthouseView(lighthouse_json) if lighthouse_json else None
+
+def get_pagespeed_api_results(url_to_test, api_key):
+    """
+    Gets Lighthouse scores for both strategies from the PageSpeed Insights API.
     Args:
         url_to_test (str): The URL to be tested by Lighthouse via PageSpeed Insights.
-        current_index (int): Current URL index being processed.
-        total_urls (int): Total number of URLs to process.
-        enable_screenshots (bool): Whether to capture screenshots.
+        api_key (str): PageSpeed Insights API key, or None to use the keyless quota.
     Returns:
-        dict: A dictionary containing mobile scores, desktop scores, and final URL, or None if an error occurs.
+        PSIResult: Mobile scores, desktop scores, and final URL, or None if an error occurs.
     """
-    progress_percent = (current_index / total_urls) * 100
-    print("=" * 60)
-    print(f"🔄 Processing URL {current_index}/{total_urls} ({progress_percent:.1f}%)")
-    print(f"📊 Current URL: {url_to_test}")
-    print("=" * 60)
+    try:
+        log.debug("🌐 Requesting mobile and desktop analyses from the PageSpeed Insights API...")
+        # The two strategies are independent analyses, so run them side by side
+        if _desktop_fetcher is None:
+            mobile_json = fetch_psi_lighthouse(url_to_test, "mobile", api_key)
+            desktop_json = fetch_psi_lighthouse(url_to_test, "desktop", api_key)
+        else:
+            desktop_future = _desktop_fetcher.submit(fetch_psi_lighthouse, url_to_test, "desktop", api_key)
+            mobile_json = fetch_psi_lighthouse(url_to_test, "mobile", api_key)
+            desktop_json = desktop_future.result()
+    except (requests.RequestException, ValueError) as e:
+        log.error(f"An error occurred during the test for {url_to_test}: {e}")
+        return None
+
+    # The API has no report page of its own, so link to the interactive analysis
+    final_url = f"https://pagespeed.web.dev/analysis?url={quote(url_to_test, safe='')}"
+    result = build_result(url_to_test, final_url, mobile_json, desktop_json)
+    # The extracted values own their strings; free the multi-MB reports right away
+    del mobile_json, desktop_json
+    return result
 
+def build_result(url_to_test, final_url, mobile_json, desktop_json):
+    """
+    Extract mobile and desktop data into a single result and print the summary table.
+    Args:
+        url_to_test (str): The URL that was tested.
+        final_url (str): Link to the PageSpeed Insights report.
+        mobile_json: Mobile LighthouseView, or None if unavailable.
+        desktop_json: Desktop LighthouseView, or None if unavailable.
+    Returns:
+        PSIResult: Mobile scores, desktop scores, and final URL.
+    """
+    # CSV values from both devices, keyed by column name
+    values = {}
+
+    # Extract mobile data (display values are kept separate for the table)
+    mobile_display = {}
+    if mobile_json:
+        log.debug("📱 Extracting mobile scores and metrics...")
+        mobile_data, mobile_display = extract_lighthouse_data(mobile_json, "mobile")
+        values.update(mobile_data)
+    else:
+        log.warning("⚠️  Mobile JSON data not available")
+
+    # Extract desktop data
+    desktop_display = {}
+    if desktop_json:
+        log.debug("💻 Extracting desktop scores and metrics...")
+        desktop_data, desktop_display = extract_lighthouse_data(desktop_json, "desktop")
+        values.update(desktop_data)
+    else:
+        log.warning("⚠️  Desktop JSON data not available")
+
+    # Display results in table format
+    if mobile_json or desktop_json:
+        display_performance_table(mobile_display, desktop_display)
+
+    return PSIResult.from_values(url_to_test, final_url, datetime.now().isoformat(timespec="seconds"), values)
+
+# Third-party requests made by the pagespeed.web.dev page that the analysis doesn't need
+_BLOCKED_URL_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+]
+
+# Command-line switches shared by every Chrome session; only the user agent and profile vary
+_BASE_CHROME_ARGS = (
+    "--headless=new",  # Current headless mode (no separate GPU toggle needed)
+    "--no-sandbox",  # Bypass OS security model
+    "--disable-dev-shm-usage",  # Overcome limited resource problems
+    "--disable-extensions",  # Disable all extensions
+    "--disable-plugins",  # Disable plugins
+    "--disable-default-apps",  # Disable default apps
+    "--no-first-run",  # Skip first-run setup
+    "--no-default-browser-check",  # Skip the default-browser probe
+    "--disable-features=Translate,BackForwardCache,InterestCohort,MediaRouter",  # Unused browser services
+    "--mute-audio",  # No audio output
+    "--window-size=1920,1080",  # Fixed viewport; screenshots emulate their own
+    "--aggressive-cache-discard",  # More aggressive memory management
+    "--memory-pressure-off",  # Turn off memory pressure checks
+    # Keep background tabs running at full speed when workers share one browser
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    # Anti-bot detection
+    "--disable-blink-features=AutomationControlled",
+    "--disk-cache-size=1",  # Nothing worth caching between analyses
+)
+
+# Temporary Chrome profile directory of each live session, removed when the session quits
+_profile_dirs = {}
+
+def make_driver():
+    """
+    Start a headless Chrome configured for PageSpeed Insights analysis.
+    Returns:
+        WebDriver: A new Chrome session; the caller must release it with quit_driver().
+    """
     # --- Setup Selenium WebDriver with optimized performance ---
     options = webdriver.ChromeOptions()
 
     # Use a random user agent to mimic a real browser
-    ua = UserAgent()
-    user_agent = ua.random
+    user_agent = random.choice(_UAS)
     options.add_argument(f"user-agent={user_agent}")
 
-    # Performance-optimized browser settings
-    options.add_argument("--headless")  # Run in headless mode for better performance
-    options.add_argument("--no-sandbox")  # Bypass OS security model
-    options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
-    options.add_argument("--disable-gpu")  # Disable GPU acceleration
-    options.add_argument("--disable-extensions")  # Disable all extensions
-    options.add_argument("--disable-plugins")  # Disable plugins
-    options.add_argument("--disable-default-apps")  # Disable default apps
-    options.add_argument("--aggressive-cache-discard")  # More aggressive memory management
-    options.add_argument("--memory-pressure-off")  # Turn off memory pressure checks
+    # Performance-optimized browser settings, the same for every session
+    for argument in _BASE_CHROME_ARGS:
+        options.add_argument(argument)
 
     # Anti-bot detection measures (minimal set for performance)
-    options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option("useAutomationExtension", False)
 
-    print("🔧 Chrome optimized: Headless mode, performance-focused settings")
+    # Keep the profile (cookies, cache, leveldb) in RAM when a tmpfs is available
+    profile_dir = tempfile.mkdtemp(prefix="lighthouse-chrome-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    options.add_argument(f"--user-data-dir={profile_dir}")
 
-    service = ChromeService(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-
-    # Use JavaScript to modify navigator.webdriver property
-    driver.execute_script(
-        "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-    )
+    log.debug("🔧 Chrome optimized: Headless mode, performance-focused settings")
 
     try:
-        # Navigate directly to the analysis URL
-        analysis_url = f"https://pagespeed.web.dev/analysis?url={url_to_test}"
-        print(f"Navigating to: {analysis_url}")
-        driver.get(analysis_url)
-
-        print("⏳ Waiting for analysis to complete...")        # Optimized wait for Lighthouse JSON data (reduced from 180s to 120s)
-        print("⚡ Waiting for Lighthouse JSON data (optimized timeout: 120s)...")
-
-        # Wait for at least one of the JSON objects to be available
-        WebDriverWait(driver, 120).until(
-            lambda driver: driver.execute_script(
-                "return window.__LIGHTHOUSE_MOBILE_JSON__ || window.__LIGHTHOUSE_DESKTOP_JSON__;"
-            )
-        )
-
-        print("✅ Initial Lighthouse JSON data detected.")
-
-        # Reduced additional wait time for both datasets
-        print("⚡ Waiting for both mobile and desktop data (optimized: 30s max)...")
+        try:
+            driver = webdriver.Chrome(service=ChromeService(driver_path()), options=options)
+        except SessionNotCreatedException:
+            # The remembered chromedriver may predate a Chrome update; resolve a matching one
+            forget_driver_path()
+            driver = webdriver.Chrome(service=ChromeService(driver_path()), options=options)
+    except Exception:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        raise
+    _profile_dirs[driver] = profile_dir
+    # Report waits run inside the page (see wait_for_lighthouse_reports) and may take the full timeout
+    driver.set_script_timeout(REPORT_WAIT_TIMEOUT + 10)
+    prepare_tab(driver)
+    return driver
+
+def prepare_tab(driver):
+    """Apply the per-tab DevTools settings to the driver's current tab."""
+    # Skip analytics and ad requests from the PageSpeed Insights page itself; Lighthouse
+    # runs on Google's servers, so this doesn't affect the measured results
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _BLOCKED_URL_PATTERNS})
+
+    # Hide navigator.webdriver on every page this session loads
+    driver.execute_cdp_cmd(
+        "Page.addScriptToEvaluateOnNewDocument",
+        {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"}
+    )
 
-        max_additional_wait = 30  # Reduced from 60 to 30 seconds
-        wait_interval = 3  # Reduced from 5 to 3 seconds for more responsive checking
-        elapsed = 0
+# Browsers are reused across URLs, one per worker thread; all of them are quit at the end of the run
+_thread_state = threading.local()
+_drivers = []
+_drivers_lock = threading.Lock()
 
-        while elapsed < max_additional_wait:
-            mobile_json = driver.execute_script("return window.__LIGHTHOUSE_MOBILE_JSON__;")
-            desktop_json = driver.execute_script("return window.__LIGHTHOUSE_DESKTOP_JSON__;")
+def quit_driver(driver):
+    """Quit a Chrome session started by make_driver() and delete its profile directory."""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    shutil.rmtree(_profile_dirs.pop(driver, ""), ignore_errors=True)
+
+def get_worker_driver():
+    """Return this worker thread's Chrome session, starting one on first use."""
+    driver = getattr(_thread_state, "driver", None)
+    if driver is None:
+        driver = make_driver()
+        _thread_state.driver = driver
+        with _drivers_lock:
+            _drivers.append(driver)
+    return driver
+
+def discard_worker_driver():
+    """Quit this worker thread's Chrome session so the next URL starts a new one."""
+    driver = getattr(_thread_state, "driver", None)
+    if driver is None:
+        return
+    _thread_state.driver = None
+    with _drivers_lock:
+        _drivers.remove(driver)
+    quit_driver(driver)
+
+def quit_all_drivers():
+    """Quit every worker's Chrome session."""
+    with _drivers_lock:
+        drivers = list(_drivers)
+        _drivers.clear()
+    for driver in drivers:
+        quit_driver(driver)
+    if drivers:
+        log.debug(f"Closed {len(drivers)} browser session(s)")
+
+class SharedBrowser:
+    """
+    One Chrome session shared by every worker thread, each working in its own tab.
+    WebDriver drives one tab at a time, so each step holds the lock while the browser is
+    switched to the caller's tab; waiting for the analysis happens with the lock released.
+    """
 
-            if mobile_json and desktop_json:
-                print("✅ Both mobile and desktop JSON data are available!")
-                break
-            elif mobile_json:
-                print(f"📱 Mobile data ready, waiting for desktop data... ({elapsed}s)")
-            elif desktop_json:
-                print(f"💻 Desktop data ready, waiting for mobile data... ({elapsed}s)")
+    def __init__(self):
+        self.driver = None
+        self.lock = threading.RLock()
+        self._local = threading.local()
+
+    @contextmanager
+    def tab(self):
+        """Hold the browser, switched to the calling thread's tab (opened on first use)."""
+        with self.lock:
+            if self.driver is None:
+                # The initial tab stays open so the session survives worker tabs closing
+                self.driver = make_driver()
+                with _drivers_lock:
+                    _drivers.append(self.driver)
+            if getattr(self._local, "driver", None) is not self.driver:
+                self.driver.switch_to.new_window("tab")
+                prepare_tab(self.driver)
+                self._local.driver = self.driver
+                self._local.handle = self.driver.current_window_handle
             else:
-                print(f"⏳ Waiting for data... ({elapsed}s)")
-
-            time.sleep(wait_interval)
-            elapsed += wait_interval
-
-        print("🔍 Extracting available results...")
-
-        # Capture screenshots before extracting data (optimized for Full HD mobile and desktop)
-        capture_full_hd_screenshots(driver, url_to_test, current_index, enable_screenshots)
-
-        # Get the final URL (remove query parameters)
-        final_url = driver.current_url.split("?")[0]
-        print(f"Final URL: {final_url}")
+                self.driver.switch_to.window(self._local.handle)
+            yield self.driver
+
+    def discard_tab(self):
+        """Close the calling thread's tab, starting a new browser if this one stopped responding."""
+        with self.lock:
+            driver = getattr(self._local, "driver", None)
+            self._local.driver = None
+            if driver is None or driver is not self.driver:
+                return
+            try:
+                driver.switch_to.window(self._local.handle)
+                driver.close()
+            except WebDriverException:
+                # The browser itself is gone; every worker's next tab opens in a new one
+                self.driver = None
+                with _drivers_lock:
+                    _drivers.remove(driver)
+                quit_driver(driver)
+
+# Set by share_browser(); None means each worker thread starts its own Chrome
+_shared_browser = None
+
+def share_browser():
+    """Make the browser workers share one Chrome, one tab each, instead of a Chrome per worker."""
+    global _shared_browser
+    _shared_browser = SharedBrowser()
+
+@contextmanager
+def worker_browser():
+    """Yield the calling worker's Chrome session, switched to its tab when the browser is shared."""
+    if _shared_browser is None:
+        yield get_worker_driver()
+    else:
+        with _shared_browser.tab() as driver:
+            yield driver
 
-        # Create result dictionary
-        result = {"url": url_to_test, "final_url": final_url}
+def discard_worker_browser():
+    """Drop the calling worker's browser (or its tab in the shared one) so the next URL starts fresh."""
+    if _shared_browser is None:
+        discard_worker_driver()
+    else:
+        _shared_browser.discard_tab()
 
-        # Extract mobile data
-        mobile_json = driver.execute_script("return window.__LIGHTHOUSE_MOBILE_JSON__;")
-        mobile_data = None
-        if mobile_json:
-            print("📱 Extracting mobile scores and metrics...")
-            mobile_data = extract_lighthouse_data(mobile_json, "mobile")
-            # Remove display data before updating result (keep it separate for table display)
-            mobile_data_clean = {k: v for k, v in mobile_data.items() if not k.startswith('_')}
-            result.update(mobile_data_clean)
-        else:
-            print("⚠️  Mobile JSON data not available")
-
-        # Extract desktop data
-        desktop_json = driver.execute_script("return window.__LIGHTHOUSE_DESKTOP_JSON__;")
-        desktop_data = None
-        if desktop_json:
-            print("💻 Extracting desktop scores and metrics...")
-            desktop_data = extract_lighthouse_data(desktop_json, "desktop")
-            # Remove display data before updating result (keep it separate for table display)
-            desktop_data_clean = {k: v for k, v in desktop_data.items() if not k.startswith('_')}
-            result.update(desktop_data_clean)
-        else:
-            print("⚠️  Desktop JSON data not available")
+def get_pagespeed_results(url_to_test, current_index=1, total_urls=1, screenshot_dir=None, use_browser=False, use_cache=True):
+    """
+    Gets Lighthouse scores from PageSpeed Insights.
+    Uses the PageSpeed Insights API, or navigates Chrome to the analysis URL when screenshots
+    are requested. Extracts both mobile and desktop scores from the Lighthouse JSON objects.
+    Args:
+        url_to_test (str): The URL to be tested by Lighthouse via PageSpeed Insights.
+        current_index (int): Current URL index being processed.
+        total_urls (int): Total number of URLs to process.
+        screenshot_dir (Path): Directory to save screenshots in, or None to skip screenshots.
+        use_browser (bool): Whether to use Chrome even without screenshots (e.g. API quota exhausted).
+        use_cache (bool): Whether to reuse a recent result from the result cache.
+    Returns:
+        PSIResult: Mobile scores, desktop scores, and final URL, or None if an error occurs.
+    """
+    progress_percent = (current_index / total_urls) * 100
+    log.info(f"🔄 Processing URL {current_index}/{total_urls} ({progress_percent:.1f}%): {url_to_test}")
+
+    # A recent result is as good as a new one unless screenshots are needed
+    if use_cache and screenshot_dir is None:
+        cached = get_result_cache().get(url_to_test)
+        # Entries written by older versions (plain dicts) are treated as misses
+        if isinstance(cached, PSIResult):
+            log.info(f"♻️  Using result from {cached.timestamp} (cached for {RESULT_CACHE_TTL}s)")
+            return cached
+
+    # Only screenshots (or --use-browser) need Chrome; everything else comes from the API
+    if screenshot_dir is None and not use_browser:
+        result = get_pagespeed_api_results(url_to_test, os.environ.get("PSI_API_KEY"))
+    else:
+        result = get_pagespeed_browser_results(url_to_test, current_index, screenshot_dir)
 
-        # Display results in table format
-        if mobile_data or desktop_data:
-            display_performance_table(mobile_data, desktop_data)
+    if result:
+        get_result_cache().set(url_to_test, result, expire=RESULT_CACHE_TTL)
+    return result
 
+def get_pagespeed_browser_results(url_to_test, current_index, screenshot_dir=None):
+    """
+    Gets Lighthouse scores by navigating Chrome to the PageSpeed Insights analysis URL
+    and reading the report JSON from the page.
+    Args:
+        url_to_test (str): The URL to be tested by Lighthouse via PageSpeed Insights.
+        current_index (int): Current URL index, used in screenshot filenames.
+        screenshot_dir (Path): Directory to save screenshots in, or None to skip screenshots.
+    Returns:
+        PSIResult: Mobile scores, desktop scores, and final URL, or None if an error occurs.
+    """
+    try:
+        analysis_url = f"https://pagespeed.web.dev/analysis?url={quote(url_to_test, safe='')}"
+        waited = RATE_LIMITER.acquire()
+        if waited:
+            log.debug(f"⏳ Rate limit reached, waited {waited:.1f} seconds before starting analysis")
+
+        # Each worker keeps its own browser (or its own tab of the shared one) between URLs
+        with worker_browser() as driver:
+            # Start from a clean slate: no cookies left over from the previous URL. Tabs of a
+            # shared browser share cookies, so other workers' analyses must keep theirs
+            if _shared_browser is None:
+                driver.delete_all_cookies()
+
+            # Navigate directly to the analysis URL
+            log.debug(f"Navigating to: {analysis_url}")
+            driver.get(analysis_url)
+
+        log.debug(f"⏳ Waiting for Lighthouse JSON data (timeout: {REPORT_WAIT_TIMEOUT}s, one reload)...")
+
+        # Wait for at least one of the JSON objects to be available. A stuck analysis
+        # gets one reload, then the URL is set aside so the worker moves on
+        for attempt in range(2):
+            if wait_for_lighthouse_reports(REPORT_WAIT_TIMEOUT):
+                break
+            if attempt:
+                record_slow_url(url_to_test)
+                raise TimeoutException(f"no Lighthouse report after {2 * REPORT_WAIT_TIMEOUT}s (added to {SLOW_URLS_FILE})")
+            log.warning(f"⏳ No report after {REPORT_WAIT_TIMEOUT}s for {url_to_test}, reloading the analysis")
+            RATE_LIMITER.acquire()
+            with worker_browser() as driver:
+                driver.refresh()
+
+        log.debug("✅ Initial Lighthouse JSON data detected.")
+
+        # Give the other device's report up to 30 more seconds
+        log.debug("⚡ Waiting for both mobile and desktop data (30s max)...")
+        if wait_for_lighthouse_reports(30, both=True):
+            log.debug("✅ Both mobile and desktop JSON data are available!")
+
+        log.debug("🔍 Extracting available results...")
+
+        with worker_browser() as driver:
+            # Both reports cross the WebDriver boundary once, after all the waiting is done
+            mobile_json, desktop_json = fetch_lighthouse_reports(driver)
+
+            # Capture screenshots before extracting data (optimized for Full HD mobile and desktop)
+            if screenshot_dir is not None:
+                capture_full_hd_screenshots(driver, url_to_test, current_index, screenshot_dir)
+
+            # Get the final URL (remove query parameters)
+            final_url = driver.current_url.split("?")[0]
+        log.debug(f"Final URL: {final_url}")
+
+        result = build_result(url_to_test, final_url, mobile_json, desktop_json)
+        # The extracted values own their strings; free the multi-MB reports before the browser shuts down
+        del mobile_json, desktop_json
         return result
 
     except Exception as e:
-        print(f"An error occurred during the test for {url_to_test}: {e}")
+        log.error(f"An error occurred during the test for {url_to_test}: {e}")
+        # The browser may be wedged or gone; the next URL on this worker starts a fresh one
+        discard_worker_browser()
         return None
-    finally:
-        # Close the browser window
-        driver.quit()
-        print(f"Browser closed for URL: {url_to_test}")
 
 
+def record_slow_url(url, filename=SLOW_URLS_FILE):
+    """Append a URL whose analysis timed out to the slow-URL list."""
+    with _slow_urls_lock, open(filename, 'a', encoding='utf-8') as f:
+        f.write(url + "\n")
+
 def extract_lighthouse_data(lighthouse_json, device_type):
     """
     Extract scores and metrics from Lighthouse JSON data.
     Args:
-        lighthouse_json: The Lighthouse JSON object
+        lighthouse_json: LighthouseView over the Lighthouse JSON object
         device_type: String indicating "mobile" or "desktop"
     Returns:
-        dict: Dictionary with scores and metrics for the specific device type
+        tuple: (data, display_data) - CSV fields keyed by column name, and the same
+        values keyed by display name for the summary table
     """
     data = {}
     display_data = {}  # Separate data structure for table display
 
     try:
         # Extract category scores (Performance, Accessibility, Best Practices, SEO)
-        categories = lighthouse_json.get('categories', {})
+        categories = lighthouse_json.categories
 
         for category_key, category_data in categories.items():
-            category_name = category_data.get('title', category_key).lower().replace(' ', '_')
             category_title = category_data.get('title', category_key)
+            category_name = _CATEGORY_KEY_TO_NAME.get(category_key)
+            if category_name is None:
+                category_name = category_title.lower().replace(' ', '_')
             score = category_data.get('score')
             if score is not None:
                 # Convert score from 0-1 scale to 0-100 scale
@@ -292,310 +993,439 @@ def extract_lighthouse_data(lighthouse_json, device_type):
                 display_data[category_title] = score_value
 
         # Extract Core Web Vitals and other metrics
-        audits = lighthouse_json.get('audits', {})
-
-        # Define the metrics we want to extract
-        metrics_mapping = {
-            'first-contentful-paint': ('First Contentful Paint', 'first_contentful_paint'),
-            'largest-contentful-paint': ('Largest Contentful Paint', 'largest_contentful_paint'),
-            'total-blocking-time': ('Total Blocking Time', 'total_blocking_time'),
-            'cumulative-layout-shift': ('Cumulative Layout Shift', 'cumulative_layout_shift'),
-            'speed-index': ('Speed Index', 'speed_index'),
-            'interactive': ('Time to Interactive', 'time_to_interactive'),
-            'first-meaningful-paint': ('First Meaningful Paint', 'first_meaningful_paint')
-        }
+        audits = lighthouse_json.audits
 
-        for audit_key, (metric_display_name, metric_name) in metrics_mapping.items():
-            audit = audits.get(audit_key, {})
-            if audit:
-                display_value = audit.get('displayValue', '')
-                numeric_value = audit.get('numericValue')
+        for audit_key, (metric_display_name, metric_name, format_value) in _METRIC_MAP.items():
+            audit = audits.get(audit_key)
+            if not audit:
+                continue
 
-                # Use display value if available, otherwise format numeric value
-                if display_value:
-                    value = display_value
-                elif numeric_value is not None:
-                    # Format based on the metric type
-                    if audit_key == 'cumulative-layout-shift':
-                        value = f"{numeric_value:.3f}"
-                    elif 'paint' in audit_key or 'interactive' in audit_key or 'blocking' in audit_key or 'index' in audit_key:
-                        # Time-based metrics - convert to seconds or milliseconds
-                        if numeric_value >= 1000:
-                            value = f"{numeric_value/1000:.2f} s"
-                        else:
-                            value = f"{numeric_value:.0f} ms"
-                    else:
-                        value = str(numeric_value)
-                else:
+            # Use display value if available, otherwise format numeric value
+            value = audit.get('displayValue')
+            if not value:
+                numeric_value = audit.get('numericValue')
+                if numeric_value is None:
                     continue
+                value = format_value(numeric_value)
 
-                data[f"{device_type}_{metric_name}"] = value
-                display_data[metric_display_name] = value
+            data[f"{device_type}_{metric_name}"] = value
+            display_data[metric_display_name] = value
 
     except Exception as e:
-        print(f"Error extracting {device_type} data from Lighthouse JSON: {e}")
+        log.error(f"Error extracting {device_type} data from Lighthouse JSON: {e}")
 
-    # Store display data for table formatting
-    data['_display_data'] = display_data
-    data['_device_type'] = device_type
+    return data, display_data
 
-    return data
+# Order of metrics in the summary table; unknown metrics follow alphabetically
+_METRIC_ORDER = (
+    'Performance', 'Accessibility', 'Best Practices', 'SEO',
+    'First Contentful Paint', 'Largest Contentful Paint',
+    'Total Blocking Time', 'Cumulative Layout Shift',
+    'Speed Index', 'Time to Interactive', 'First Meaningful Paint'
+)
 
-def display_performance_table(mobile_data, desktop_data):
+def display_performance_table(mobile_display, desktop_display):
     """
     Display performance metrics in a formatted table
+    Args:
+        mobile_display (dict): Mobile values keyed by metric display name.
+        desktop_display (dict): Desktop values keyed by metric display name.
     """
-    # Extract display data
-    mobile_display = mobile_data.get('_display_data', {}) if mobile_data else {}
-    desktop_display = desktop_data.get('_display_data', {}) if desktop_data else {}
-
     # Combine all unique metrics
-    all_metrics = set(mobile_display.keys()) | set(desktop_display.keys())
+    all_metrics = mobile_display.keys() | desktop_display.keys()
 
     if not all_metrics:
-        print("⚠️  No performance data available for table display")
+        log.warning("⚠️  No performance data available for table display")
         return
 
-    # Define the order of metrics for better organization
-    metric_order = [
-        'Performance', 'Accessibility', 'Best Practices', 'SEO',
-        'First Contentful Paint', 'Largest Contentful Paint',
-        'Total Blocking Time', 'Cumulative Layout Shift',
-        'Speed Index', 'Time to Interactive', 'First Meaningful Paint'
-    ]
-
     # Sort metrics by defined order, with unknown metrics at the end
-    ordered_metrics = []
-    for metric in metric_order:
-        if metric in all_metrics:
-            ordered_metrics.append(metric)
-
-    # Add any remaining metrics not in the predefined order
-    for metric in sorted(all_metrics):
-        if metric not in ordered_metrics:
-            ordered_metrics.append(metric)
-
-    # Calculate column widths
-    metric_width = max(len(metric) for metric in ordered_metrics) + 2
-    mobile_width = max(len(str(mobile_display.get(metric, 'N/A'))) for metric in ordered_metrics) + 2
-    desktop_width = max(len(str(desktop_display.get(metric, 'N/A'))) for metric in ordered_metrics) + 2
-
-    # Ensure minimum widths for headers
-    metric_width = max(metric_width, 25)
-    mobile_width = max(mobile_width, 12)
-    desktop_width = max(desktop_width, 12)
-
-    # Print table header
-    print(f"\n📊 Performance Metrics Summary")
-    print("=" * (metric_width + mobile_width + desktop_width + 6))
-    print(f"{'Metric':<{metric_width}} | {'📱 Mobile':<{mobile_width}} | {'🖥️  Desktop':<{desktop_width}}")
-    print("=" * (metric_width + mobile_width + desktop_width + 6))
-
-    # Print metrics rows
-    for metric in ordered_metrics:
-        mobile_value = mobile_display.get(metric, 'N/A')
-        desktop_value = desktop_display.get(metric, 'N/A')
-
-        # Add color coding for scores (if they're numeric)
-        mobile_display_value = format_metric_value(mobile_value)
-        desktop_display_value = format_metric_value(desktop_value)
-
-        print(f"{metric:<{metric_width}} | {mobile_display_value:<{mobile_width}} | {desktop_display_value:<{desktop_width}}")
+    ordered_metrics = [metric for metric in _METRIC_ORDER if metric in all_metrics]
+    ordered_metrics += sorted(all_metrics.difference(_METRIC_ORDER))
 
-    print("=" * (metric_width + mobile_width + desktop_width + 6))
-    print()
+    # Format every cell and measure the column widths in a single pass
+    rows = []
+    metric_width, mobile_width, desktop_width = 23, 10, 10
+    for metric in ordered_metrics:
+        mobile_value = format_metric_value(mobile_display.get(metric, 'N/A'))
+        desktop_value = format_metric_value(desktop_display.get(metric, 'N/A'))
+        rows.append((metric, mobile_value, desktop_value))
+        metric_width = max(metric_width, len(metric))
+        mobile_width = max(mobile_width, len(mobile_value))
+        desktop_width = max(desktop_width, len(desktop_value))
+
+    # Padding around each column
+    metric_width += 2
+    mobile_width += 2
+    desktop_width += 2
+    rule = "=" * (metric_width + mobile_width + desktop_width + 6)
+
+    # Build the table and print it at once so concurrent workers don't interleave rows
+    lines = [
+        "\n📊 Performance Metrics Summary",
+        rule,
+        f"{'Metric':<{metric_width}} | {'📱 Mobile':<{mobile_width}} | {'🖥️  Desktop':<{desktop_width}}",
+        rule,
+    ]
+    lines.extend(
+        f"{metric:<{metric_width}} | {mobile_value:<{mobile_width}} | {desktop_value:<{desktop_width}}"
+        for metric, mobile_value, desktop_value in rows
+    )
+    lines.append(rule)
+    log.info("\n".join(lines) + "\n")
 
 def format_metric_value(value):
     """
     Format metric values with color coding for scores
     """
-    if str(value).isdigit():
+    if type(value) is int or (isinstance(value, str) and value.isdigit()):
         score = int(value)
-        if score >= 90:
-            return f"{value} ✅"  # Good
-        elif score >= 50:
-            return f"{value} ⚠️"   # Needs improvement
-        else:
-            return f"{value} ❌"   # Poor
-    else:
-        return str(value)
+        return f"{value} {'✅' if score >= 90 else '⚠️' if score >= 50 else '❌'}"
+    return str(value)
 
-def write_to_csv(data, filename="pagespeed_results.csv"):
+def read_csv_header(filename):
     """
-    Writes a dictionary of results to a CSV file with structured columns.
+    Read the header row of an existing CSV file.
     Args:
-        data (dict): The dictionary containing the results.
-        filename (str): The name of the CSV file to write to.
+        filename (str): The name of the CSV file to read.
+    Returns:
+        list: The column names, or an empty list if the file is empty.
     """
-    if not data:
-        print("No data to write to CSV.")
-        return
+    with open(filename, "r", newline="", encoding="utf-8") as csvfile:
+        return next(csv.reader(csvfile), [])
 
-    # Create a clean copy of data excluding internal fields
-    clean_data = {k: v for k, v in data.items() if not k.startswith('_')}
-
-    # Define structured fieldnames for better CSV organization (original clean format)
-    fieldnames = [
-        "url",
-        "final_url",
-        # Mobile scores
-        "mobile_performance",
-        "mobile_accessibility",
-        "mobile_best_practices",
-        "mobile_seo",
-        # Desktop scores
-        "desktop_performance",
-        "desktop_accessibility",
-        "desktop_best_practices",
-        "desktop_seo",
-        # Mobile metrics
-        "mobile_first_contentful_paint",
-        "mobile_largest_contentful_paint",
-        "mobile_total_blocking_time",
-        "mobile_cumulative_layout_shift",
-        "mobile_speed_index",
-        "mobile_time_to_interactive",
-        "mobile_first_meaningful_paint",
-        # Desktop metrics
-        "desktop_first_contentful_paint",
-        "desktop_largest_contentful_paint",
-        "desktop_total_blocking_time",
-        "desktop_cumulative_layout_shift",
-        "desktop_speed_index",
-        "desktop_time_to_interactive",
-        "desktop_first_meaningful_paint",
-    ]
+def rotate_csv_header(filename):
+    """
+    Rewrite an existing CSV file so its header matches the current field list.
+    The file is rebuilt next to the original and swapped in atomically.
+    Args:
+        filename (str): The name of the CSV file to rewrite.
+    """
+    with open(filename, "r", newline="", encoding="utf-8") as csvfile:
+        reader = csv.DictReader(csvfile)
+        # Keep columns that only exist in the file (e.g. from an earlier run)
+        register_fieldnames(reader.fieldnames or [])
+        rows = list(reader)
+
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=current_fieldnames(), extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+    os.replace(temp_filename, filename)
+    log.info(f"Updated CSV headers with new columns: {filename}")
+
+class ResultCsvWriter:
+    """
+    Appends result rows to a CSV file through one buffered handle kept open for the whole run.
+    The header is reconciled once when the file is opened, and again only if new columns appear.
+    """
 
-    # Add any additional fields found in the clean data that aren't in our standard list
-    # (excluding internal fields that start with underscore)
-    for key in clean_data.keys():
-        if key not in fieldnames:
-            fieldnames.append(key)
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = None
+        self._writer = None
+        self._open()
 
-    # Check if the file exists to decide whether to write headers
-    try:
-        with open(filename, "r", newline="") as f:
-            file_exists = True
-    except FileNotFoundError:
-        file_exists = False
+    def _open(self):
+        # New columns (or a file from an older version) must be reflected in the header
+        if os.path.exists(self.filename) and os.path.getsize(self.filename) and read_csv_header(self.filename) != current_fieldnames():
+            rotate_csv_header(self.filename)
 
-    # Open the CSV file in append mode and write the data
-    with open(filename, "a", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction="ignore")
+        self._file = open(self.filename, "a", newline="", encoding="utf-8", buffering=1 << 16)
+        self._writer = csv.DictWriter(self._file, fieldnames=current_fieldnames(), extrasaction="ignore")
 
         # Write the header row only if the file is new
-        if not file_exists:
-            writer.writeheader()
-            print(f"Created new CSV file with headers: {filename}")
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+            log.info(f"Created new CSV file with headers: {self.filename}")
+
+    def write_rows(self, rows):
+        """
+        Write a batch of results and push them to disk.
+        Args:
+            rows (list): The PSIResult objects to write.
+        """
+        # Only values outside the fixed schema can add columns
+        extra_fields = False
+        for data in rows:
+            if data.extras:
+                extra_fields = register_fieldnames(data.extras) or extra_fields
+
+        # The header has to grow, which means rewriting the file under a new handle
+        if extra_fields:
+            self.close()
+            self._open()
+
+        self._writer.writerows(data.as_row() for data in rows)
+        self._file.flush()
+
+    def close(self):
+        """Close the underlying file handle."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+# Open CSV writers by filename; closed by close_results() at the end of the run
+_result_writers = {}
+
+def write_rows_to_csv(rows, filename="pagespeed_results.csv"):
+    """
+    Writes a batch of results to a CSV file with structured columns.
+    Args:
+        rows (list): The PSIResult objects to write.
+        filename (str): The name of the CSV file to write to.
+    """
+    if not rows:
+        log.info("No data to write to CSV.")
+        return
+
+    writer = _result_writers.get(filename)
+    if writer is None:
+        writer = _result_writers[filename] = ResultCsvWriter(filename)
+    writer.write_rows(rows)
 
-        # Write the clean data row (without internal fields)
-        writer.writerow(clean_data)
+    log.info(f"💾 {len(rows)} result(s) successfully written to {filename}")
+
+def write_to_csv(data, filename="pagespeed_results.csv"):
+    """
+    Writes one result to a CSV file with structured columns.
+    Args:
+        data (PSIResult): The result to write.
+        filename (str): The name of the CSV file to write to.
+    """
+    write_rows_to_csv([data] if data else [], filename)
 
-    print(f"Results for {clean_data.get('url', 'N/A')} successfully written to {filename}")
+def queue_result(data):
+    """
+    Queue a result row for the next batched CSV write.
+    Args:
+        data (PSIResult): The result to queue.
+    Returns:
+        int: Number of rows waiting to be written.
+    """
+    with _pending_rows_lock:
+        _pending_rows.append(data)
+        return len(_pending_rows)
+
+def flush_results(filename="pagespeed_results.csv"):
+    """
+    Write all queued result rows to the CSV file in a single batch.
+    Args:
+        filename (str): The name of the CSV file to write to.
+    """
+    with _pending_rows_lock:
+        if _pending_rows:
+            write_rows_to_csv(_pending_rows, filename)
+            _pending_rows.clear()
+
+def close_results():
+    """Close every CSV file opened for results."""
+    with _pending_rows_lock:
+        for writer in _result_writers.values():
+            writer.close()
+        _result_writers.clear()
+
+def filter_recently_analyzed(urls, filename="pagespeed_results.csv", refresh_hours=24):
+    """
+    Drop URLs that already have a result in the CSV file newer than refresh_hours.
+    Args:
+        urls (list): Candidate URLs to analyze.
+        filename (str): The CSV file holding earlier results.
+        refresh_hours (float): Freshness window; 0 disables skipping.
+    Returns:
+        list: The URLs that still need an analysis, in their original order.
+    """
+    if refresh_hours <= 0 or not os.path.exists(filename):
+        return urls
 
+    # Latest analysis time per URL
+    last_seen = {}
+    with open(filename, "r", newline="", encoding="utf-8") as csvfile:
+        for row in csv.DictReader(csvfile):
+            try:
+                timestamp = datetime.fromisoformat(row.get("timestamp") or "")
+            except ValueError:
+                continue
+            url = row.get("url")
+            if url not in last_seen or timestamp > last_seen[url]:
+                last_seen[url] = timestamp
 
+    cutoff = datetime.now() - timedelta(hours=refresh_hours)
+    stale_urls = [url for url in urls if url not in last_seen or last_seen[url] < cutoff]
 
+    skipped = len(urls) - len(stale_urls)
+    if skipped:
+        log.info(f"⏭️  Skipping {skipped} URLs already analyzed within {refresh_hours:g}h (see {filename})")
+    return stale_urls
 
+def read_recorded_results(filename="pagespeed_results.csv"):
+    """
+    Collect the results already written to the CSV file, so a cached result isn't written twice.
+    Args:
+        filename (str): The CSV file holding earlier results.
+    Returns:
+        set: (url, timestamp) of every row in the file; empty if there is no file.
+    """
+    if not os.path.exists(filename):
+        return set()
+    with open(filename, "r", newline="", encoding="utf-8") as csvfile:
+        return {(row.get("url"), row.get("timestamp")) for row in csv.DictReader(csvfile)}
 
-def read_urls_from_file(filename="urls.txt"):
+def read_urls_from_file(filename="urls.txt", verbose=False):
     """
     Read URLs from a text file, one URL per line.
     Ignores blank lines, comments, and validates URL format.
+    URLs are canonicalized and duplicates are removed, keeping the first occurrence.
     Args:
         filename (str): The name of the text file containing URLs.
+        verbose (bool): Whether to list each invalid line instead of only counting them.
     Returns:
-        list: A list of valid URLs, with empty lines and invalid URLs filtered out.
+        list: A list of unique valid URLs, with empty lines and invalid URLs filtered out.
     """
     try:
-        urls = []
-        invalid_lines = []
+        urls, invalid_lines = parse_urls(filename)
 
-        with open(filename, 'r', encoding='utf-8') as file:
-            for line_num, line in enumerate(file, 1):
-                # Strip whitespace
-                clean_line = line.strip()
-
-                # Skip empty lines
-                if not clean_line:
-                    continue
-
-                # Skip comment lines (starting with #)
-                if clean_line.startswith('#'):
-                    continue
-
-                # Basic URL validation - must start with http:// or https://
-                if clean_line.startswith(('http://', 'https://')):
-                    urls.append(clean_line)
-                else:
-                    invalid_lines.append(f"Line {line_num}: '{clean_line}' (invalid URL format)")
+        # Drop duplicates while keeping the original order
+        duplicate_count = len(urls)
+        urls = list(dict.fromkeys(urls))
+        duplicate_count -= len(urls)
 
         # Report results
         if urls:
-            print(f"✅ Successfully loaded {len(urls)} valid URLs from {filename}")
+            log.info(f"✅ Successfully loaded {len(urls)} valid URLs from {filename}")
+            if duplicate_count:
+                log.info(f"🔁 Removed {duplicate_count} duplicate URLs")
             if invalid_lines:
-                print(f"⚠️  Skipped {len(invalid_lines)} invalid lines:")
-                for invalid in invalid_lines:
-                    print(f"   {invalid}")
+                if verbose:
+                    log.warning(f"⚠️  Skipped {len(invalid_lines)} invalid lines:\n" + "\n".join(
+                        f"   Line {line_num}: '{line}' (invalid URL format)" for line_num, line in invalid_lines
+                    ))
+                else:
+                    log.warning(f"⚠️  Skipped {len(invalid_lines)} invalid lines (run with --verbose to list them)")
         else:
-            print(f"❌ No valid URLs found in {filename}")
+            log.error(f"❌ No valid URLs found in {filename}")
 
         return urls
 
     except FileNotFoundError:
-        print(f"❌ Error: File '{filename}' not found.")
-        print("Please create a 'urls.txt' file with URLs (one per line) or specify a different filename.")
+        log.error(f"❌ Error: File '{filename}' not found.")
+        log.error("Please create a 'urls.txt' file with URLs (one per line) or specify a different filename.")
         return []
     except Exception as e:
-        print(f"❌ Error reading file '{filename}': {e}")
+        log.error(f"❌ Error reading file '{filename}': {e}")
         return []
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Lighthouse analysis via PageSpeed Insights for the URLs in urls.txt.")
+    parser.add_argument("--verbose", action="store_true", help="Show per-step progress and list every invalid line found in urls.txt")
+    parser.add_argument("--concurrency", type=int,
+                        help="URLs analyzed in parallel (default: PSI_WORKERS, or PSI_BROWSER_WORKERS when using Chrome)")
+    parser.add_argument("--use-browser", action="store_true",
+                        help="Scrape results with Chrome instead of the PageSpeed Insights API (e.g. when the API quota is exhausted)")
+    parser.add_argument("--single-browser", action="store_true",
+                        help="Run the browser workers as tabs of one Chrome instead of one Chrome each (less memory)")
+    parser.add_argument("--screenshots", action=argparse.BooleanOptionalAction,
+                        help="Capture full-page screenshots (asked interactively when neither flag is given)")
+    parser.add_argument("--no-cache", action="store_true", help="Analyze every URL again instead of reusing cached results")
+    args = parser.parse_args()
+    setup_logging(args.verbose)
+
     # Read URLs from external file
-    test_urls = read_urls_from_file("urls.txt")
+    test_urls = read_urls_from_file("urls.txt", verbose=args.verbose)
 
     if not test_urls:
-        print("No URLs found to test. Exiting.")
+        log.error("No URLs found to test. Exiting.")
         exit(1)
 
-    # Ask user if they want screenshot capture
-    response = input("📸 Enable screenshot capture? (Y/n): ").lower().strip()
-    enable_screenshots = response != 'n'
+    # Reuse results from recent runs (PSI_REFRESH_HOURS=0 re-analyzes everything)
+    test_urls = filter_recently_analyzed(test_urls, refresh_hours=float(os.environ.get("PSI_REFRESH_HOURS", "24")))
 
-    if enable_screenshots:
-        print(f"📸 Screenshots will be saved to a timestamped directory")
-
-    print(f"🚀 Starting Lighthouse analysis for {len(test_urls)} URLs...")
-    print("=" * 60)
-
-    for i, url in enumerate(test_urls, 1):
-        # Get the lighthouse results for each URL with progress tracking and optional screenshots
-        page_speed_scores = get_pagespeed_results(url, i, len(test_urls), enable_screenshots)
-        # Write the results to a CSV file
-        if page_speed_scores:
-            # Write main scores
-            write_to_csv(page_speed_scores)
-            print(f"✅ Successfully processed: {url}")
-        else:
-            print(f"❌ Failed to process: {url}")
+    if not test_urls:
+        log.info("All URLs were analyzed recently. Nothing to do.")
+        exit(0)
 
-        # Add a delay between tests to avoid being flagged as a bot
-        if i < len(test_urls):  # Don't delay after the last URL
-            delay = random.randint(5, 10)
-            print(f"⏳ Waiting {delay} seconds before next test...")
-            time.sleep(delay)
+    # Ask user if they want screenshot capture, unless --screenshots/--no-screenshots already said
+    enable_screenshots = args.screenshots
+    if enable_screenshots is None:
+        response = input("📸 Enable screenshot capture? (Y/n): ").lower().strip()
+        enable_screenshots = response != 'n'
 
-    print("\n" + "=" * 60)
-    print("🎉 All tests completed!")
-    print("📊 Generated files:")
-    print("  • pagespeed_results.csv - Core performance metrics and scores")
+    # One screenshot directory for the whole run, shared by every worker
+    screenshot_dir = None
+    if enable_screenshots:
+        screenshot_dir = Path(f"screenshots-{datetime.now():%Y%m%d_%H%M%S}")
+        screenshot_dir.mkdir(exist_ok=True)
+        log.info(f"📁 Created screenshot directory: {screenshot_dir}")
+
+    use_browser = enable_screenshots or args.use_browser
+    if use_browser:
+        # Resolve chromedriver up front so browser workers don't race to install it
+        driver_path()
+        if args.single_browser:
+            share_browser()
+
+    # Cached results keep their original timestamp; rows the CSV already has are not written again
+    recorded_results = read_recorded_results() if not args.no_cache else set()
+
+    log.info(f"🚀 Starting Lighthouse analysis for {len(test_urls)} URLs...")
+    log.info("=" * 60)
+
+    # Each worker thread drives its own Chrome (or its own tab with --single-browser) when the browser is used
+    workers = args.concurrency or (BROWSER_WORKERS if use_browser else PSI_WORKERS)
+    if not use_browser:
+        # One pooled connection per request in flight (mobile + desktop per worker), so none are dropped
+        SESSION = build_psi_session(pool_maxsize=2 * workers)
+        start_desktop_fetcher(workers)
+
+    try:
+        with queued_logging(), ThreadPoolExecutor(max_workers=workers) as executor:
+            # Get the lighthouse results for each URL with progress tracking and optional screenshots
+            futures = {
+                executor.submit(
+                    get_pagespeed_results, url, i, len(test_urls), screenshot_dir, use_browser, not args.no_cache
+                ): url
+                for i, url in enumerate(test_urls, 1)
+            }
+            # Collect in urls.txt order so the CSV (and the report built from it) keeps that order
+            for future, url in futures.items():
+                try:
+                    page_speed_scores = future.result()
+                except Exception as e:
+                    # One broken analysis must not discard the rest of the batch
+                    log.error(f"❌ Failed to process: {url} ({e})")
+                    continue
+                # Queue the results for the CSV file, writing a checkpoint every CSV_FLUSH_EVERY rows
+                if page_speed_scores:
+                    if (page_speed_scores.url, page_speed_scores.timestamp) in recorded_results:
+                        log.debug(f"📄 Cached result for {url} is already in the CSV file")
+                    elif queue_result(page_speed_scores) >= CSV_FLUSH_EVERY:
+                        flush_results()
+                    log.info(f"✅ Successfully processed: {url}")
+                else:
+                    log.error(f"❌ Failed to process: {url}")
+    finally:
+        # Write whatever is still queued, even if the run was interrupted
+        flush_results()
+        close_results()
+        stop_desktop_fetcher()
+        quit_all_drivers()
+        finish_screenshot_optimization()
+        close_result_cache()
+
+    log.info("\n" + "=" * 60)
+    log.info("🎉 All tests completed!")
+    log.info("📊 Generated files:")
+    log.info("  • pagespeed_results.csv - Core performance metrics and scores")
 
     # Show screenshot summary if enabled
-    if enable_screenshots and SCREENSHOT_DIR and os.path.exists(SCREENSHOT_DIR):
-        screenshots = [f for f in os.listdir(SCREENSHOT_DIR) if f.endswith('.png')]
+    if screenshot_dir:
+        screenshots = [f for f in os.listdir(screenshot_dir) if f.endswith('.png')]
         if screenshots:
-            print(f"  📸 {SCREENSHOT_DIR}/ - Screenshots ({len(screenshots)} files)")
+            log.info(f"  📸 {screenshot_dir}/ - Screenshots ({len(screenshots)} files)")
             mobile_screenshots = [f for f in screenshots if f.startswith('fullhd_mobile_')]
             desktop_screenshots = [f for f in screenshots if f.startswith('fullhd_desktop_')]
-            print(f"    📱 Mobile: {len(mobile_screenshots)} | 🖥️  Desktop: {len(desktop_screenshots)}")
+            log.info(f"    📱 Mobile: {len(mobile_screenshots)} | 🖥️  Desktop: {len(desktop_screenshots)}")
         else:
-            print("  ⚠️  No screenshots were captured")
+            log.warning("  ⚠️  No screenshots were captured")
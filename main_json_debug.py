@@ -1,76 +1,200 @@
+import argparse
 import csv
-import time
-import random
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException, WebDriverException
 from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
 from fake_useragent import UserAgent
+from pathlib import Path
+from urllib.parse import quote
+from chromedriver_utils import driver_path, forget_driver_path
+from urls_utils import parse_urls
 
-def get_pagespeed_results(url_to_test, current_index=1, total_urls=1, debug=False):
+# Upper bound for --concurrency
+MAX_CONCURRENCY = 5
+
+# Command-line switches shared by every Chrome session; only the user agent and headless mode vary
+BASE_CHROME_ARGS = (
+    # Privacy and clean browser settings
+    "--incognito",  # Run in incognito/private mode
+    "--disable-extensions",  # Disable all extensions
+    "--disable-plugins",  # Disable plugins
+    "--disable-default-apps",  # Disable default apps
+    "--no-first-run",  # Skip first-run setup
+    "--no-default-browser-check",  # Skip the default-browser probe
+    # Anti-bot detection measures
+    "--disable-blink-features=AutomationControlled",
+    # Performance options
+    "--no-sandbox",  # Bypass OS security model
+    "--disable-dev-shm-usage",  # Overcome limited resource problems
+    "--disable-features=Translate,BackForwardCache,InterestCohort,MediaRouter",  # Unused browser services
+    "--disable-background-timer-throttling",  # Keep polling at full speed in the background
+    "--disable-renderer-backgrounding",
+    "--mute-audio",  # No audio output
+    "--window-size=1920,1080",  # Fixed viewport, also in debug mode
+    "--blink-settings=imagesEnabled=false",  # Don't decode images; nothing on the page is ever looked at
+)
+
+# User-agent pool, loaded once; every new browser session draws a random one from it
+USER_AGENTS = UserAgent()
+
+# Seconds to wait for the first Lighthouse report before reloading the analysis page once
+REPORT_WAIT_TIMEOUT = 60
+
+# Resolves once either report global is set, polling inside the page so the wait is one
+# WebDriver call; resolves false when timeoutMs runs out first
+WAIT_FOR_REPORT_JS = """
+const [timeoutMs, done] = arguments;
+const ready = () => !!(window.__LIGHTHOUSE_MOBILE_JSON__ || window.__LIGHTHOUSE_DESKTOP_JSON__);
+const deadline = Date.now() + timeoutMs;
+const check = () => {
+    if (ready() || Date.now() >= deadline) {
+        done(ready());
+    } else {
+        setTimeout(check, 100);
+    }
+};
+check();
+"""
+
+# URLs whose analysis never produced a report, one per line, for a later re-run
+SLOW_URLS_FILE = "slow_urls.txt"
+_slow_urls_lock = threading.Lock()
+
+# Static resources the PageSpeed Insights page loads that the JSON extraction doesn't need
+BLOCKED_RESOURCE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg",
+    "*.woff", "*.woff2", "*.ttf",
+    "*.mp4", "*.webm",
+]
+
+
+def build_driver(debug=False):
     """
-    Gets PageSpeed Insights scores by directly navigating to analysis URL.
-    Extracts both mobile and desktop scores from JSON objects.
+    Start a Chrome session configured for PageSpeed Insights analysis.
     Args:
-        url_to_test (str): The URL to be tested by PageSpeed Insights.
-        current_index (int): Current URL index being processed.
-        total_urls (int): Total number of URLs to process.
-        debug (bool): If True, saves raw JSON data to files for inspection.
+        debug (bool): If True, runs with a visible browser window.
     Returns:
-        dict: A dictionary containing mobile scores, desktop scores, and final URL, or None if an error occurs.
+        WebDriver: A new Chrome session; the caller is responsible for quitting it.
     """
-    progress_percent = (current_index / total_urls) * 100
-    print("=" * 60)
-    print(f"🔄 Processing URL {current_index}/{total_urls} ({progress_percent:.1f}%)")
-    print(f"📊 Current URL: {url_to_test}")
-    print("=" * 60)
-
     # --- Setup Selenium WebDriver with anti-bot measures ---
     options = webdriver.ChromeOptions()
 
     # Use a random user agent to mimic a real browser
-    ua = UserAgent()
-    user_agent = ua.random
+    user_agent = USER_AGENTS.random
     options.add_argument(f"user-agent={user_agent}")
 
-    # Privacy and clean browser settings
-    options.add_argument("--incognito")  # Run in incognito/private mode
-    options.add_argument("--disable-extensions")  # Disable all extensions
-    options.add_argument("--disable-plugins")  # Disable plugins
-    options.add_argument("--disable-default-apps")  # Disable default apps
-
-    # Anti-bot detection measures
-    options.add_argument("--disable-blink-features=AutomationControlled")
+    # Privacy, performance and anti-bot settings, the same for every session
+    for argument in BASE_CHROME_ARGS:
+        options.add_argument(argument)
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option("useAutomationExtension", False)
 
-    # Performance and security options
-    options.add_argument("--no-sandbox")  # Bypass OS security model
-    options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
-    options.add_argument("--disable-gpu")  # Disable GPU acceleration
-    options.add_argument("--disable-web-security")  # Disable web security
-    options.add_argument("--allow-running-insecure-content")  # Allow mixed content
-
     # For debugging, you might want to remove headless mode to see what's happening
     if not debug:
-        options.add_argument("--headless")  # Run in headless mode
+        options.add_argument("--headless=new")  # Run in headless mode
 
     print("🔧 Chrome configured: Incognito mode, no extensions, optimized for analysis")
 
-    service = ChromeService(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-
-    # Use JavaScript to modify navigator.webdriver property
-    driver.execute_script(
-        "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+    try:
+        driver = webdriver.Chrome(service=ChromeService(driver_path()), options=options)
+    except SessionNotCreatedException:
+        # The remembered chromedriver may predate a Chrome update; resolve a matching one
+        forget_driver_path()
+        driver = webdriver.Chrome(service=ChromeService(driver_path()), options=options)
+
+    # The report wait runs inside the page and may take the full timeout
+    driver.set_script_timeout(REPORT_WAIT_TIMEOUT + 10)
+
+    # Only the Lighthouse JSON globals are read, so skip images, fonts and media on the PSI page
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
+
+    # Hide navigator.webdriver on every page this session loads
+    driver.execute_cdp_cmd(
+        "Page.addScriptToEvaluateOnNewDocument",
+        {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"}
     )
+    return driver
 
+
+def is_session_alive(driver):
+    """Check whether the Chrome session still responds to WebDriver commands."""
     try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+
+# Browsers are reused across URLs, one per worker thread; all of them are quit at the end of the run
+_thread_state = threading.local()
+_drivers = []
+_drivers_lock = threading.Lock()
+
+
+def process_url(url_to_test, current_index, total_urls, debug=False):
+    """
+    Analyze one URL with this worker thread's browser, starting or replacing it as needed.
+    Returns:
+        dict: The results from get_pagespeed_results, or None if an error occurs.
+    """
+    driver = getattr(_thread_state, "driver", None)
+    if driver is None:
+        try:
+            driver = _thread_state.driver = build_driver(debug)
+        except Exception as e:
+            # The next URL on this worker tries again
+            print(f"❌ Could not start a browser for {url_to_test}: {e}")
+            return None
+        with _drivers_lock:
+            _drivers.append(driver)
+
+    result = get_pagespeed_results(url_to_test, driver, current_index, total_urls, debug=debug)
+
+    # A dead session is only replaced when it actually fails
+    if result is None and not is_session_alive(driver):
+        print("🔁 Browser session lost, the next URL on this worker starts a new one")
+        _thread_state.driver = None
+        with _drivers_lock:
+            _drivers.remove(driver)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+    return result
+
+
+def get_pagespeed_results(url_to_test, driver, current_index=1, total_urls=1, debug=False):
+    """
+    Gets PageSpeed Insights scores by directly navigating to analysis URL.
+    Extracts both mobile and desktop scores from JSON objects.
+    Args:
+        url_to_test (str): The URL to be tested by PageSpeed Insights.
+        driver: Selenium WebDriver instance, reused across URLs.
+        current_index (int): Current URL index being processed.
+        total_urls (int): Total number of URLs to process.
+        debug (bool): If True, saves raw JSON data to files for inspection.
+    Returns:
+        dict: A dictionary containing mobile scores, desktop scores, and final URL, or None if an error occurs.
+    """
+    progress_percent = (current_index / total_urls) * 100
+    print("=" * 60)
+    print(f"🔄 Processing URL {current_index}/{total_urls} ({progress_percent:.1f}%)")
+    print(f"📊 Current URL: {url_to_test}")
+    print("=" * 60)
+
+    try:
+        # Start from a clean slate: no cookies or cached responses from the previous URL
+        driver.delete_all_cookies()
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+
         # Navigate directly to the analysis URL
-        analysis_url = f"https://pagespeed.web.dev/analysis?url={url_to_test}"
+        analysis_url = f"https://pagespeed.web.dev/analysis?url={quote(url_to_test, safe='')}"
         print(f"Navigating to: {analysis_url}")
         driver.get(analysis_url)
         print("Waiting for analysis to complete...")
@@ -79,12 +203,16 @@ def get_pagespeed_results(url_to_test, current_index=1, total_urls=1, debug=Fals
         # We'll wait for either JSON object to be available
         print("⏳ Waiting for Lighthouse JSON data to be available...")
 
-        # Wait for at least one of the JSON objects to be available
-        WebDriverWait(driver, 180).until(
-            lambda driver: driver.execute_script(
-                "return window.__LIGHTHOUSE_MOBILE_JSON__ || window.__LIGHTHOUSE_DESKTOP_JSON__;"
-            )
-        )
+        # Wait for at least one of the JSON objects to be available; a stuck analysis
+        # gets one reload, then the URL is set aside so the worker moves on
+        for attempt in range(2):
+            if driver.execute_async_script(WAIT_FOR_REPORT_JS, REPORT_WAIT_TIMEOUT * 1000):
+                break
+            if attempt:
+                record_slow_url(url_to_test)
+                raise TimeoutException(f"no Lighthouse report after {2 * REPORT_WAIT_TIMEOUT}s (added to {SLOW_URLS_FILE})")
+            print(f"⏳ No report after {REPORT_WAIT_TIMEOUT}s, reloading the analysis...")
+            driver.refresh()
 
         print("✅ Lighthouse JSON data detected. Extracting results...")
 
@@ -93,7 +221,7 @@ def get_pagespeed_results(url_to_test, current_index=1, total_urls=1, debug=Fals
         print(f"Final URL: {final_url}")
 
         # Create result dictionary
-        result = {"url": url_to_test, "final_url": final_url}
+        result = {"url": url_to_test, "final_url": final_url, "timestamp": datetime.now().isoformat(timespec="seconds")}
 
         # Extract mobile data
         mobile_json = driver.execute_script("return window.__LIGHTHOUSE_MOBILE_JSON__;")
@@ -128,10 +256,12 @@ def get_pagespeed_results(url_to_test, current_index=1, total_urls=1, debug=Fals
     except Exception as e:
         print(f"An error occurred during the test for {url_to_test}: {e}")
         return None
-    finally:
-        # Close the browser window
-        driver.quit()
-        print(f"Browser closed for URL: {url_to_test}")
+
+
+def record_slow_url(url, filename=SLOW_URLS_FILE):
+    """Append a URL whose analysis timed out to the slow-URL list."""
+    with _slow_urls_lock, open(filename, 'a', encoding='utf-8') as f:
+        f.write(url + "\n")
 
 
 def extract_lighthouse_data(lighthouse_json, device_type):
@@ -205,115 +335,116 @@ def extract_lighthouse_data(lighthouse_json, device_type):
     return data
 
 
-def write_to_csv(data, filename="pagespeed_results.csv"):
+# Structured CSV columns; other fields are left out so rows always match the header
+FIELDNAMES = (
+    "url",
+    "final_url",
+    # Mobile scores
+    "mobile_performance",
+    "mobile_accessibility",
+    "mobile_best_practices",
+    "mobile_seo",
+    # Desktop scores
+    "desktop_performance",
+    "desktop_accessibility",
+    "desktop_best_practices",
+    "desktop_seo",
+    # Mobile metrics
+    "mobile_first_contentful_paint",
+    "mobile_largest_contentful_paint",
+    "mobile_total_blocking_time",
+    "mobile_cumulative_layout_shift",
+    "mobile_speed_index",
+    "mobile_time_to_interactive",
+    "mobile_first_meaningful_paint",
+    # Desktop metrics
+    "desktop_first_contentful_paint",
+    "desktop_largest_contentful_paint",
+    "desktop_total_blocking_time",
+    "desktop_cumulative_layout_shift",
+    "desktop_speed_index",
+    "desktop_time_to_interactive",
+    "desktop_first_meaningful_paint",
+    # When the analysis ran (main.py skips URLs with a recent result)
+    "timestamp",
+)
+
+
+def read_csv_header(filename):
     """
-    Writes a dictionary of results to a CSV file with structured columns.
+    Read the header row of an existing CSV file.
+    Args:
+        filename (str): The name of the CSV file to read.
+    Returns:
+        list: The column names, or an empty list if the file is empty.
+    """
+    with open(filename, "r", newline="", encoding="utf-8") as csvfile:
+        return next(csv.reader(csvfile), [])
+
+
+def open_results_csv(filename="pagespeed_results.csv"):
+    """
+    Open the results CSV once for the whole run, writing the header if the file is new.
     Args:
-        data (dict): The dictionary containing the results.
         filename (str): The name of the CSV file to write to.
+    Returns:
+        tuple: (file, csv.DictWriter) - the caller closes the file when the run ends.
     """
-    if not data:
-        print("No data to write to CSV.")
-        return
+    # main.py may have created the file with a different column set (e.g. extra columns);
+    # rows must follow the header that is already there
+    fieldnames = FIELDNAMES
+    if os.path.exists(filename) and os.path.getsize(filename):
+        fieldnames = read_csv_header(filename) or FIELDNAMES
 
-    # Define structured fieldnames for better CSV organization
-    fieldnames = [
-        "url",
-        "final_url",
-        # Mobile scores
-        "mobile_performance",
-        "mobile_accessibility",
-        "mobile_best_practices",
-        "mobile_seo",
-        # Desktop scores
-        "desktop_performance",
-        "desktop_accessibility",
-        "desktop_best_practices",
-        "desktop_seo",
-        # Mobile metrics
-        "mobile_first_contentful_paint",
-        "mobile_largest_contentful_paint",
-        "mobile_total_blocking_time",
-        "mobile_cumulative_layout_shift",
-        "mobile_speed_index",
-        "mobile_time_to_interactive",
-        "mobile_first_meaningful_paint",
-        # Desktop metrics
-        "desktop_first_contentful_paint",
-        "desktop_largest_contentful_paint",
-        "desktop_total_blocking_time",
-        "desktop_cumulative_layout_shift",
-        "desktop_speed_index",
-        "desktop_time_to_interactive",
-        "desktop_first_meaningful_paint",
-    ]
-
-    # Add any additional fields found in the data that aren't in our standard list
-    for key in data.keys():
-        if key not in fieldnames:
-            fieldnames.append(key)
-
-    # Check if the file exists to decide whether to write headers
-    try:
-        with open(filename, "r", newline="") as f:
-            file_exists = True
-    except FileNotFoundError:
-        file_exists = False
+    csvfile = open(filename, "a", newline="", encoding="utf-8")
+    writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction="ignore")
 
-    # Open the CSV file in append mode and write the data
-    with open(filename, "a", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction="ignore")
+    # Write the header row only if the file is new
+    if csvfile.tell() == 0:
+        writer.writeheader()
+        print(f"Created new CSV file with headers: {filename}")
 
-        # Write the header row only if the file is new
-        if not file_exists:
-            writer.writeheader()
-            print(f"Created new CSV file with headers: {filename}")
+    return csvfile, writer
 
-        # Write the data row
-        writer.writerow(data)
 
-    print(f"Results for {data.get('url', 'N/A')} successfully written to {filename}")
+def write_to_csv(data, csvfile, writer):
+    """
+    Writes a dictionary of results to the open results CSV.
+    Args:
+        data (dict): The dictionary containing the results.
+        csvfile: The file returned by open_results_csv.
+        writer (csv.DictWriter): The writer returned by open_results_csv.
+    """
+    if not data:
+        print("No data to write to CSV.")
+        return
+
+    # Write the data row and push it to disk so an interrupted run keeps finished results
+    writer.writerow(data)
+    csvfile.flush()
+
+    print(f"Results for {data.get('url', 'N/A')} successfully written to {csvfile.name}")
 
 
 def read_urls_from_file(filename="urls.txt"):
     """
     Read URLs from a text file, one URL per line.
-    Ignores blank lines, comments, and validates URL format.
+    Ignores blank lines, comments, and validates URL format; URLs are canonicalized.
     Args:
         filename (str): The name of the text file containing URLs.
     Returns:
         list: A list of valid URLs, with empty lines and invalid URLs filtered out.
     """
     try:
-        urls = []
-        invalid_lines = []
-
-        with open(filename, 'r', encoding='utf-8') as file:
-            for line_num, line in enumerate(file, 1):
-                # Strip whitespace
-                clean_line = line.strip()
-
-                # Skip empty lines
-                if not clean_line:
-                    continue
-
-                # Skip comment lines (starting with #)
-                if clean_line.startswith('#'):
-                    continue
-
-                # Basic URL validation - must start with http:// or https://
-                if clean_line.startswith(('http://', 'https://')):
-                    urls.append(clean_line)
-                else:
-                    invalid_lines.append(f"Line {line_num}: '{clean_line}' (invalid URL format)")
+        urls, invalid_lines = parse_urls(filename)
 
         # Report results
         if urls:
             print(f"✅ Successfully loaded {len(urls)} valid URLs from {filename}")
             if invalid_lines:
                 print(f"⚠️  Skipped {len(invalid_lines)} invalid lines:")
-                for invalid in invalid_lines:
-                    print(f"   {invalid}")
+                for line_num, line in invalid_lines:
+                    print(f"   Line {line_num}: '{line}' (invalid URL format)")
         else:
             print(f"❌ No valid URLs found in {filename}")
 
@@ -329,6 +460,16 @@ def read_urls_from_file(filename="urls.txt"):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run PageSpeed Insights analysis and optionally save the raw Lighthouse JSON.")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help=f"Number of browsers analyzing URLs in parallel (default: 4, max: {MAX_CONCURRENCY})")
+    args = parser.parse_args()
+
+    # More parallel analyses than this quickly trips PageSpeed Insights rate limiting
+    concurrency = max(1, min(args.concurrency, MAX_CONCURRENCY))
+    if concurrency != args.concurrency:
+        print(f"⚠️  Using concurrency {concurrency} (allowed range is 1-{MAX_CONCURRENCY})")
+
     # Read URLs from external file
     test_urls = read_urls_from_file("urls.txt")
 
@@ -339,27 +480,45 @@ if __name__ == "__main__":
     # Ask user if they want debug mode
     debug_mode = input("Enable debug mode? (saves JSON files for inspection) [y/N]: ").lower().startswith('y')
 
-    print(f"Starting PageSpeed analysis for {len(test_urls)} URLs...")
+    print(f"Starting PageSpeed analysis for {len(test_urls)} URLs with {concurrency} browser(s)...")
     if debug_mode:
         print("🔍 Debug mode enabled - JSON files will be saved")
     print("=" * 60)
 
-    for i, url in enumerate(test_urls, 1):
-        # Get the pagespeed results for each URL with progress tracking
-        page_speed_scores = get_pagespeed_results(url, i, len(test_urls), debug=debug_mode)
+    # Resolve chromedriver up front so the workers don't race to install it
+    driver_path()
 
-        # Write the results to a CSV file
-        if page_speed_scores:
-            write_to_csv(page_speed_scores)
-            print(f"✅ Successfully processed: {url}")
-        else:
-            print(f"❌ Failed to process: {url}")
+    # Results are written from this thread only, through one handle kept open for the run
+    csvfile, writer = open_results_csv()
 
-        # Add a delay between tests to avoid being flagged as a bot
-        if i < len(test_urls):  # Don't delay after the last URL
-            delay = random.randint(5, 10)
-            print(f"⏳ Waiting {delay} seconds before next test...")
-            time.sleep(delay)
+    # Parallel browsers stagger the requests, so there is no fixed delay between URLs
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Get the pagespeed results for each URL with progress tracking
+            futures = {
+                executor.submit(process_url, url, i, len(test_urls), debug_mode): url
+                for i, url in enumerate(test_urls, 1)
+            }
+            for future in as_completed(futures):
+                url = futures[future]
+                page_speed_scores = future.result()
+
+                # Write the results to a CSV file (only this thread writes, so rows never interleave)
+                if page_speed_scores:
+                    write_to_csv(page_speed_scores, csvfile, writer)
+                    print(f"✅ Successfully processed: {url}")
+                else:
+                    print(f"❌ Failed to process: {url}")
+    finally:
+        csvfile.close()
+
+        # Close the browser windows
+        for driver in _drivers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass  # Session already gone; keep closing the others
+        print(f"Closed {len(_drivers)} browser(s)")
 
     print("\n" + "=" * 60)
     print("🎉 All tests completed!")
@@ -8,12 +8,14 @@ import sys
 import os
 import webbrowser
 from pathlib import Path
+from urls_utils import parse_urls
 
 def cleanup_existing_files():
     """Clean up existing result files before starting new analysis"""
     files_to_cleanup = [
         "pagespeed_results.csv",
-        "pagespeed_report.html"
+        "pagespeed_report.html",
+        "slow_urls.txt"
     ]
     cleaned_files = []
 
@@ -39,11 +41,11 @@ def cleanup_existing_files():
     return True
 
 def run_command(command, description):
-    """Run a command and handle errors"""
+    """Run a command (argument list, no shell) and handle errors"""
     print(f"\n🔄 {description}...")
     try:
         # Run command without capturing output to show real-time progress
-        result = subprocess.run(command, shell=True)
+        result = subprocess.run(command)
         if result.returncode == 0:
             print(f"✅ {description} completed successfully")
             return True
@@ -93,44 +95,28 @@ def main():
         print("📝 Please create urls.txt with your target URLs (one per line)")
         return False
 
-    # Validate and count URLs using same logic as main.py
-    valid_urls = []
-    invalid_lines = []
-    total_lines = 0
+    # Validate and count URLs with the same parser main.py uses
+    valid_urls, invalid_lines = parse_urls("urls.txt")
 
-    with open("urls.txt", "r", encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            total_lines += 1
-            # Strip whitespace
-            clean_line = line.strip()
-
-            # Skip empty lines
-            if not clean_line:
-                continue
-
-            # Skip comment lines (starting with #)
-            if clean_line.startswith('#'):
-                continue
-
-            # Basic URL validation - must start with http:// or https://
-            if clean_line.startswith(('http://', 'https://')):
-                valid_urls.append(clean_line)
-            else:
-                invalid_lines.append(f"Line {line_num}: '{clean_line}'")
+    # main.py analyzes each URL once, so count unique URLs (order preserved)
+    duplicate_count = len(valid_urls)
+    valid_urls = list(dict.fromkeys(valid_urls))
+    duplicate_count -= len(valid_urls)
 
     # Show detailed URL analysis
     print(f"📊 URL Analysis Results:")
-    print(f"   📄 Total lines in file: {total_lines}")
     print(f"   ✅ Valid URLs found: {len(valid_urls)}")
+    if duplicate_count:
+        print(f"   🔁 Duplicate URLs skipped: {duplicate_count}")
 
     if invalid_lines:
         print(f"   ⚠️  Invalid lines skipped: {len(invalid_lines)}")
         if len(invalid_lines) <= 3:
-            for invalid in invalid_lines:
-                print(f"      • {invalid}")
+            for line_num, line in invalid_lines:
+                print(f"      • Line {line_num}: '{line}'")
         else:
-            for invalid in invalid_lines[:2]:
-                print(f"      • {invalid}")
+            for line_num, line in invalid_lines[:2]:
+                print(f"      • Line {line_num}: '{line}'")
             print(f"      • ... and {len(invalid_lines)-2} more")
 
     if not valid_urls:
@@ -143,21 +129,18 @@ def main():
     enable_screenshots = response != 'n'
 
     # Step 1: Run optimized Lighthouse analysis (with integrated Full HD screenshot support)
-    analysis_command = f"{python_path} main.py"
     if enable_screenshots:
-        # Pass 'Y' input to enable screenshots
-        analysis_command = f"echo 'Y' | {python_path} main.py"
+        analysis_command = [python_path, "main.py", "--screenshots"]
         print("📸 Using optimized script with Full HD screenshot capture")
     else:
-        # Pass 'n' input to disable screenshots
-        analysis_command = f"echo 'n' | {python_path} main.py"
+        analysis_command = [python_path, "main.py", "--no-screenshots"]
         print("📊 Using optimized script without screenshots")
 
     if not run_command(analysis_command, "Optimized Lighthouse Analysis with Full HD Screenshots" if enable_screenshots else "Optimized Lighthouse Analysis"):
         return False
 
     # Step 2: Generate HTML dashboard
-    if not run_command(f"{python_path} generate_html_report.py", "HTML Dashboard Generation"):
+    if not run_command([python_path, "generate_html_report.py"], "HTML Dashboard Generation"):
         return False
 
     # Summary
@@ -39,7 +39,7 @@ print_status $CYAN "📋 Step 2: Checking Python installation..."
 if ! command -v python3 &> /dev/null; then
     print_status $RED "❌ Python 3 is not installed."
     echo ""
-    print_status $YELLOW "📥 Please install Python 3.7+ first:"
+    print_status $YELLOW "📥 Please install Python 3.10+ first:"
     case $OS in
         "macOS")
             echo "   • Download from: https://www.python.org/downloads/"
@@ -61,12 +61,12 @@ fi
 PYTHON_VERSION=$(python3 --version 2>&1)
 print_status $GREEN "✅ Python found: $PYTHON_VERSION"
 
-# Check Python version (should be 3.7+)
+# Check Python version (should be 3.10+)
 PYTHON_MAJOR=$(python3 -c 'import sys; print(sys.version_info.major)')
 PYTHON_MINOR=$(python3 -c 'import sys; print(sys.version_info.minor)')
-if [ "$PYTHON_MAJOR" -lt 3 ] || ([ "$PYTHON_MAJOR" -eq 3 ] && [ "$PYTHON_MINOR" -lt 7 ]); then
-    print_status $RED "❌ Python 3.7+ is required. Found: $PYTHON_VERSION"
-    print_status $YELLOW "Please upgrade to Python 3.7 or newer."
+if [ "$PYTHON_MAJOR" -lt 3 ] || ([ "$PYTHON_MAJOR" -eq 3 ] && [ "$PYTHON_MINOR" -lt 10 ]); then
+    print_status $RED "❌ Python 3.10+ is required. Found: $PYTHON_VERSION"
+    print_status $YELLOW "Please upgrade to Python 3.10 or newer."
     exit 1
 fi
 
@@ -153,7 +153,7 @@ if [ -f "requirements.txt" ]; then
         print_status $YELLOW "🔄 Attempting manual installation of core packages..."
 
         # Fallback: Install core packages manually
-        CORE_PACKAGES=("selenium>=4.0.0" "webdriver-manager>=4.0.0" "fake-useragent>=1.4.0" "pandas>=2.0.0" "openpyxl>=3.1.0")
+        CORE_PACKAGES=("selenium>=4.0.0" "webdriver-manager>=4.0.0" "fake-useragent>=1.4.0" "orjson>=3.9.0" "requests>=2.31.0" "diskcache>=5.6.0" "pandas>=2.0.0" "numpy>=1.22.4" "openpyxl>=3.1.0")
         for package in "${CORE_PACKAGES[@]}"; do
             print_status $YELLOW "Installing $package..."
             python -m pip install "$package"
@@ -299,6 +299,27 @@ except ImportError as e:
     print(f'❌ Fake User Agent: FAILED - {e}')
     exit(1)
 
+try:
+    import orjson
+    print('✅ orjson: OK')
+except ImportError as e:
+    print(f'❌ orjson: FAILED - {e}')
+    exit(1)
+
+try:
+    import requests
+    print('✅ Requests: OK')
+except ImportError as e:
+    print(f'❌ Requests: FAILED - {e}')
+    exit(1)
+
+try:
+    import diskcache
+    print('✅ diskcache: OK')
+except ImportError as e:
+    print(f'❌ diskcache: FAILED - {e}')
+    exit(1)
+
 try:
     import pandas
     print('✅ Pandas: OK')
@@ -306,6 +327,13 @@ except ImportError as e:
     print(f'❌ Pandas: FAILED - {e}')
     exit(1)
 
+try:
+    import numpy
+    print('✅ NumPy: OK')
+except ImportError as e:
+    print(f'❌ NumPy: FAILED - {e}')
+    exit(1)
+
 try:
     import openpyxl
     print('✅ OpenPyXL: OK')
@@ -0,0 +1,84 @@
+"""
+URL file parsing shared by the Lighthouse Automation Suite scripts
+Reads urls.txt (one URL per line, # comments) and validates/canonicalizes each entry
+"""
+import mmap
+import os
+import re
+from urllib.parse import urlsplit, urlunsplit
+
+# Non-blank, non-comment lines of a URL file, with surrounding whitespace trimmed
+URL_LINE_RE = re.compile(rb"^[ \t]*([^#\s][^\r\n]*?)[ \t\r]*$", re.MULTILINE)
+
+# http(s) URL with a non-empty host and no embedded whitespace
+URL_RE = re.compile(r"^https?://[^\s/$.?#].[^\s]*$", re.IGNORECASE)
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so equivalent spellings map to the same analysis.
+    Lowercases the scheme and host, drops default ports and fragments,
+    and uses "/" for an empty path.
+    Args:
+        url (str): The URL to normalize.
+    Returns:
+        str: The canonical URL, or None if it has no host, an invalid port, or user:password@ credentials.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+
+    if not parts.hostname:
+        return None
+
+    # PageSpeed Insights can't log in, and dropping the credentials would analyze a different page
+    if parts.username is not None or parts.password is not None:
+        return None
+
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname
+    if ':' in netloc:
+        # IPv6 literals keep their brackets
+        netloc = f"[{netloc}]"
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        netloc = f"{netloc}:{port}"
+
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+def parse_urls(path):
+    """
+    Parse a URL file in a single pass.
+    Blank lines and # comments are skipped; every other line must be an http(s) URL.
+    Args:
+        path (str): The URL file to read.
+    Returns:
+        tuple: (urls, invalid_lines) - the canonical URLs in file order (duplicates kept),
+               and a list of (line_number, line) for lines that aren't valid URLs.
+    Raises:
+        FileNotFoundError: If the file doesn't exist.
+    """
+    urls = []
+    invalid_lines = []
+
+    with open(path, 'rb') as file:
+        # mmap refuses empty files
+        if os.fstat(file.fileno()).st_size == 0:
+            return urls, invalid_lines
+
+        # Scan the whole file with one regex instead of stripping and testing each line
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            # Line numbers are only needed for invalid lines, so count newlines lazily up to each one
+            line_num, counted_to = 1, 0
+            for match in URL_LINE_RE.finditer(buffer):
+                clean_line = match.group(1).decode('utf-8', errors='replace')
+
+                canonical_url = canonicalize_url(clean_line) if URL_RE.match(clean_line) else None
+                if canonical_url:
+                    urls.append(canonical_url)
+                else:
+                    line_num += buffer[counted_to:match.start()].count(b"\n")
+                    counted_to = match.start()
+                    invalid_lines.append((line_num, clean_line))
+
+    return urls, invalid_lines